@@ -9,14 +9,37 @@ load_dotenv()
 # Use SQLite for simplicity in deployment
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mmm_platform.db")
 
+# Connection pool for server databases: connections checked before use and recycled
+# before server-side idle timeouts drop them. Budget: each worker process opens up to
+# pool_size + max_overflow connections per engine, so the defaults allow
+# WEB_CONCURRENCY (4) x 10 = 40 connections, 80 with a separate ANALYTICS_DATABASE_URL,
+# under PostgreSQL's default max_connections of 100. Requests beyond that wait up to
+# pool_timeout for a free connection.
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+    "pool_timeout": 30,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+}
+
 # Add check_same_thread=False for SQLite
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read-only source for analytical queries (e.g. a replica or a
+# DuckDB snapshot of daily_marketing_data). Defaults to the primary database.
+ANALYTICS_DATABASE_URL = os.getenv("ANALYTICS_DATABASE_URL")
+
+if ANALYTICS_DATABASE_URL:
+    analytics_engine = create_engine(ANALYTICS_DATABASE_URL, **POOL_OPTIONS)
+else:
+    analytics_engine = engine
+
 Base = declarative_base()
 
 def get_db():
@@ -1,22 +1,28 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Numeric, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from .database import Base
-from datetime import datetime
 
 class DailyMarketingData(Base):
     __tablename__ = "daily_marketing_data"
     
     date = Column(Date, primary_key=True)
     channel = Column(String(50), primary_key=True)
-    spend = Column(Numeric(10, 2))
+    spend = Column(Numeric(10, 2, asdecimal=False))
     impressions = Column(Integer)
     clicks = Column(Integer)
     conversions = Column(Integer)
-    revenue = Column(Numeric(10, 2))
+    revenue = Column(Numeric(10, 2, asdecimal=False))
     new_customers = Column(Integer)
     returning_customers = Column(Integer)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    # Date range scans use the (date, channel) primary key; per-channel date range
+    # scans (channel performance and trends) use this index
+    __table_args__ = (
+        Index('idx_daily_data_channel_date', 'channel', 'date'),
+    )
 
 class Campaign(Base):
     __tablename__ = "campaigns"
@@ -26,10 +32,10 @@ class Campaign(Base):
     campaign_name = Column(String(200))
     start_date = Column(Date)
     end_date = Column(Date)
-    budget = Column(Numeric(10, 2))
+    budget = Column(Numeric(10, 2, asdecimal=False))
     campaign_type = Column(String(50))  # 'awareness', 'conversion', 'retention'
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class ExternalFactor(Base):
     __tablename__ = "external_factors"
@@ -39,8 +45,8 @@ class ExternalFactor(Base):
     holiday_name = Column(String(100))
     competitor_activity = Column(String(200))
     seasonality_index = Column(Numeric(3, 2), default=1.0)  # 1.0 = normal, 1.5 = high season
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class AttributionResult(Base):
     __tablename__ = "attribution_results"
@@ -49,6 +55,11 @@ class AttributionResult(Base):
     date = Column(Date)
     channel = Column(String(50))
     model_type = Column(String(50))  # 'linear', 'time_decay', 'u_shaped', 'data_driven'
-    attributed_conversions = Column(Numeric(10, 2))
-    attributed_revenue = Column(Numeric(10, 2))
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    attributed_conversions = Column(Numeric(10, 2, asdecimal=False))
+    attributed_revenue = Column(Numeric(10, 2, asdecimal=False))
+    created_at = Column(DateTime, server_default=func.now())
+    
+    # Backs the per-model delete/refresh of a period in AttributionService
+    __table_args__ = (
+        Index('idx_attribution_model_date', 'model_type', 'date'),
+    )
\ No newline at end of file
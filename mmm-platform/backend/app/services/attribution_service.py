@@ -1,43 +1,89 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import select, func, and_
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Optional
+from operator import itemgetter
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import pandas as pd
 import numpy as np
+from ..models.database import analytics_engine
 from ..models.models import DailyMarketingData, AttributionResult
+from ..utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Simulated touchpoint position weights by channel characteristics
+FIRST_TOUCH_WEIGHT = MappingProxyType({
+    'Google Ads': 0.35,  # Often first discovery
+    'Meta Ads': 0.30,
+    'TikTok': 0.25,
+    'Email': 0.05,      # Rarely first touch
+    'Affiliate': 0.05
+})
+
+LAST_TOUCH_WEIGHT = MappingProxyType({
+    'Google Ads': 0.30,
+    'Meta Ads': 0.20,
+    'Email': 0.25,      # Often closes deals
+    'Affiliate': 0.20,
+    'TikTok': 0.05
+})
+
+# Combined 40% first + 40% last share per channel (unknown channels get 0.2 each)
+U_SHAPED_EDGE_WEIGHT = MappingProxyType({
+    channel: 0.4 * FIRST_TOUCH_WEIGHT.get(channel, 0.2) + 0.4 * LAST_TOUCH_WEIGHT.get(channel, 0.2)
+    for channel in FIRST_TOUCH_WEIGHT.keys() | LAST_TOUCH_WEIGHT.keys()
+})
+DEFAULT_U_SHAPED_EDGE_WEIGHT = 0.4 * 0.2 + 0.4 * 0.2
+
+# Channels reported with zero values when a period has no data
+_DEFAULT_CHANNELS = ('Google Ads', 'Meta Ads', 'Email', 'TikTok', 'Affiliate')
+
+# Process-wide LRU of computed attribution results, keyed by
+# (model_type, start, end, source data version)
+_RESULTS_CACHE = TTLCache(maxsize=64)
+
+# Shared worker pool for running attribution models side by side
+_MODEL_EXECUTOR = ThreadPoolExecutor(max_workers=5, thread_name_prefix='attribution')
 
 class AttributionService:
     def __init__(self, db: Session):
         self.db = db
+        self._dispatch = {
+            'last_click': self._last_click_attribution,
+            'linear': self._linear_attribution,
+            'time_decay': self._time_decay_attribution,
+            'u_shaped': self._u_shaped_attribution,
+            'data_driven': self._data_driven_attribution
+        }
     
     def calculate_attribution(self, start_date: str, end_date: str, model_type: str = 'linear') -> Dict:
         """Calculate attribution for a given period and model"""
         try:
-            start = datetime.strptime(start_date, "%Y-%m-%d")
-            end = datetime.strptime(end_date, "%Y-%m-%d")
+            start = datetime.fromisoformat(start_date)
+            end = datetime.fromisoformat(end_date)
         except ValueError as e:
             # Handle date parsing errors
             return {'error': f'Invalid date format: {str(e)}'}
         
-        # Get conversion data
-        conversions_data = self._get_conversions_data(start, end)
-        
-        # Apply attribution model
-        if model_type == 'last_click':
-            attributed = self._last_click_attribution(conversions_data)
-        elif model_type == 'linear':
-            attributed = self._linear_attribution(conversions_data)
-        elif model_type == 'time_decay':
-            attributed = self._time_decay_attribution(conversions_data)
-        elif model_type == 'u_shaped':
-            attributed = self._u_shaped_attribution(conversions_data)
-        elif model_type == 'data_driven':
-            attributed = self._data_driven_attribution(conversions_data)
-        else:
+        if model_type not in self._dispatch:
             return {'error': f'Unknown attribution model: {model_type}'}
         
-        # Save results
-        self._save_attribution_results(attributed, model_type, start, end)
+        # Reuse results already computed (and saved) for unchanged source data
+        cache_key = (model_type, start, end, self._data_version(start, end))
+        attributed = self._get_cached_results(cache_key)
+        
+        if attributed is None:
+            # Get conversion data and apply attribution model
+            conversions_data = self._load_model_data([model_type], start, end)
+            attributed = self._calculate_attribution_from_df(conversions_data[model_type], model_type)
+            
+            # Save results
+            self._save_attribution_results(attributed, model_type, start, end)
+            self.db.commit()
+            self._cache_results(cache_key, attributed)
         
         return {
             'model': model_type,
@@ -46,8 +92,91 @@ class AttributionService:
             'summary': self._calculate_attribution_summary(attributed)
         }
     
+    def _load_model_data(self, models: List[str], start: datetime, end: datetime) -> Dict[str, pd.DataFrame]:
+        """Load the input frame each model needs, querying each granularity at most once"""
+        # Time decay needs per-day granularity, the other models per-channel totals
+        channel_data = None
+        daily_data = None
+        data = {}
+        
+        # With a separate analytics database each query gets its own pooled connection,
+        # so load both granularities concurrently (the session's connection can't be shared)
+        needs_daily = 'time_decay' in models
+        needs_channel = any(model != 'time_decay' for model in models)
+        if needs_daily and needs_channel and analytics_engine is not self.db.get_bind():
+            daily_future = _MODEL_EXECUTOR.submit(self._get_daily_conversions_data, start, end)
+            channel_data = self._get_conversions_data(start, end)
+            daily_data = daily_future.result()
+        
+        for model in models:
+            if model == 'time_decay':
+                if daily_data is None:
+                    daily_data = self._get_daily_conversions_data(start, end)
+                data[model] = daily_data
+            else:
+                if channel_data is None:
+                    channel_data = self._get_conversions_data(start, end)
+                data[model] = channel_data
+        
+        return data
+    
+    def _calculate_attribution_from_df(self, df: pd.DataFrame, model_type: str) -> Optional[List[Dict]]:
+        """Apply an attribution model to preloaded conversion data"""
+        fn = self._dispatch.get(model_type)
+        if fn is None:
+            return None
+        return fn(df)
+    
+    def _get_cached_results(self, key: tuple) -> Optional[List[Dict]]:
+        """Look up previously computed attribution results"""
+        return _RESULTS_CACHE.get(key)
+    
+    def _cache_results(self, key: tuple, results: List[Dict]):
+        """Store attribution results, evicting the least recently used entry"""
+        _RESULTS_CACHE.set(key, results)
+    
+    def _data_version(self, start: datetime, end: datetime) -> tuple:
+        """Cheap fingerprint of the source rows for a period (row count + latest update)"""
+        stmt = select(
+            func.count(),
+            func.max(DailyMarketingData.updated_at)
+        ).where(
+            and_(
+                DailyMarketingData.date >= start.date(),
+                DailyMarketingData.date <= end.date()
+            )
+        )
+        
+        if analytics_engine is self.db.get_bind():
+            return tuple(self.db.execute(stmt).one())
+        
+        with analytics_engine.connect() as conn:
+            return tuple(conn.execute(stmt).one())
+    
+    def _read_frame(self, stmt) -> pd.DataFrame:
+        """Run a read-only analytical query against the analytics database"""
+        if analytics_engine is self.db.get_bind():
+            return self._frame_from_result(self.db.connection().execute(stmt))
+        
+        with analytics_engine.connect() as conn:
+            return self._frame_from_result(conn.execute(stmt))
+    
+    def _frame_from_result(self, result) -> pd.DataFrame:
+        """Build a frame straight from the result rows (skips read_sql's wrapping and type passes;
+        the loaders set the dtypes they need)"""
+        return pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()))
+    
+    def _conversion_sums(self) -> Tuple:
+        """SUM columns shared by the attribution queries (COALESCE keeps NULL-only
+        groups numeric so the columns load as int64/float64 rather than object)"""
+        return (
+            func.coalesce(func.sum(DailyMarketingData.conversions), 0).label('conversions'),
+            func.coalesce(func.sum(DailyMarketingData.revenue), 0).label('revenue'),
+            func.coalesce(func.sum(DailyMarketingData.clicks), 0).label('clicks')
+        )
+    
     def _get_conversions_data(self, start: datetime, end: datetime) -> pd.DataFrame:
-        """Get conversion data with touchpoints"""
+        """Get conversion data aggregated per channel"""
         # For simplicity, we'll simulate touchpoint data based on channel interactions
         # In a real system, this would come from user journey tracking
         
@@ -55,173 +184,199 @@ class AttributionService:
         start_date = start.date() if hasattr(start, 'date') else start
         end_date = end.date() if hasattr(end, 'date') else end
         
-        data = self.db.query(DailyMarketingData).filter(
+        # Let the database do the per-channel aggregation
+        stmt = select(
+            DailyMarketingData.channel,
+            *self._conversion_sums()
+        ).where(
             and_(
                 DailyMarketingData.date >= start_date,
                 DailyMarketingData.date <= end_date
             )
-        ).all()
-        
-        # Convert to DataFrame with aggregation by channel
-        channel_data = {}
-        for d in data:
-            if d.channel not in channel_data:
-                channel_data[d.channel] = {
-                    'conversions': 0,
-                    'revenue': 0.0,
-                    'clicks': 0
-                }
-            channel_data[d.channel]['conversions'] += d.conversions
-            channel_data[d.channel]['revenue'] += float(d.revenue)
-            channel_data[d.channel]['clicks'] += d.clicks
-        
-        # Create DataFrame from aggregated data
-        if channel_data:
-            df_data = []
-            for channel, metrics in channel_data.items():
-                df_data.append({
-                    'date': end_date,
-                    'channel': channel,
-                    'conversions': metrics['conversions'],
-                    'revenue': metrics['revenue'],
-                    'clicks': metrics['clicks']
-                })
-            df = pd.DataFrame(df_data)
-        else:
+        ).group_by(DailyMarketingData.channel)
+        
+        df = self._read_frame(stmt)
+        
+        if df.empty:
             # Create empty DataFrame with proper structure
-            df = pd.DataFrame(columns=['date', 'channel', 'conversions', 'revenue', 'clicks'])
+            return pd.DataFrame(columns=['date', 'channel', 'conversions', 'revenue', 'clicks']).astype({'channel': 'category'})
+        
+        df.insert(0, 'date', end_date)
+        df['channel'] = self._channel_categorical(df['channel'])
+        return df.astype({'conversions': 'int64', 'revenue': 'float64', 'clicks': 'int64'})
+    
+    def _get_daily_conversions_data(self, start: datetime, end: datetime) -> pd.DataFrame:
+        """Get conversion data per channel and day, weighted by recency"""
+        start_date = start.date() if hasattr(start, 'date') else start
+        end_date = end.date() if hasattr(end, 'date') else end
+        
+        stmt = select(
+            DailyMarketingData.date,
+            DailyMarketingData.channel,
+            *self._conversion_sums()
+        ).where(
+            and_(
+                DailyMarketingData.date >= start_date,
+                DailyMarketingData.date <= end_date
+            )
+        ).group_by(DailyMarketingData.channel, DailyMarketingData.date)
         
+        df = self._read_frame(stmt)
+        
+        if df.empty:
+            return pd.DataFrame(columns=['date', 'channel', 'conversions', 'revenue', 'clicks', 'time_weight']).astype({'channel': 'category'})
+        
+        df = df.astype({'conversions': 'int64', 'revenue': 'float64', 'clicks': 'int64'})
+        df['channel'] = self._channel_categorical(df['channel'])
+        
+        # Exponential decay with a 30-day time constant, relative to the latest day.
+        # There is one distinct weight per day in the window, so look them up.
+        dates = pd.to_datetime(df['date'])
+        days_ago = (dates.max() - dates).dt.days.to_numpy()
+        decay_table = np.exp(-np.arange(days_ago.max() + 1, dtype=np.float64) / 30.0)
+        df['time_weight'] = decay_table[days_ago]
         return df
     
+    def _channel_categorical(self, channels: pd.Series) -> pd.Categorical:
+        """Integer-code the channel column once; categories keep first-appearance order"""
+        return pd.Categorical(channels, categories=pd.unique(channels))
+    
+    def _channel_totals(self, df: pd.DataFrame, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum each row of a (k, N) value array per channel using the categorical channel codes"""
+        codes = df['channel'].cat.codes.to_numpy(dtype=np.intp)
+        channels = df['channel'].cat.categories.to_numpy(dtype=object)
+        
+        totals = np.zeros((len(values), len(channels)))
+        np.add.at(totals, (slice(None), codes), values)
+        return channels, totals
+    
+    def _empty_result(self) -> List[Dict]:
+        """Zero-valued results for the default channels"""
+        return [
+            {
+                'channel': channel,
+                'attributed_conversions': 0,
+                'attributed_revenue': 0.0,
+                'percentage': 0.0
+            }
+            for channel in _DEFAULT_CHANNELS
+        ]
+    
     def _last_click_attribution(self, df: pd.DataFrame) -> List[Dict]:
         """Last click attribution - 100% credit to last touchpoint"""
-        results = []
-        
         # If DataFrame is empty, return default channels with zero values
         if df.empty:
-            for channel in ['Google Ads', 'Meta Ads', 'Email', 'TikTok', 'Affiliate']:
-                results.append({
-                    'channel': channel,
-                    'attributed_conversions': 0,
-                    'attributed_revenue': 0.0,
-                    'percentage': 0.0
-                })
-            return results
-        
-        for channel in df['channel'].unique():
-            channel_data = df[df['channel'] == channel]
-            
-            results.append({
-                'channel': channel,
-                'attributed_conversions': int(channel_data['conversions'].sum()),
-                'attributed_revenue': float(channel_data['revenue'].sum()),
-                'percentage': 0  # Will calculate after
-            })
+            return self._empty_result()
         
-        # Calculate percentages
-        total_conversions = sum(r['attributed_conversions'] for r in results)
-        for r in results:
-            r['percentage'] = round((r['attributed_conversions'] / total_conversions * 100), 2) if total_conversions > 0 else 0
+        values = df[['conversions', 'revenue']].to_numpy(dtype=np.float64).T
+        channels, (conversions, revenue) = self._channel_totals(df, values)
+        conversions = conversions.astype(np.int64)
         
-        return results
+        # Calculate percentages for all channels at once
+        total_conversions = conversions.sum()
+        if total_conversions > 0:
+            percentages = np.round(conversions / total_conversions * 100, 2)
+        else:
+            percentages = np.zeros(len(channels))
+        
+        return [
+            {
+                'channel': channel,
+                'attributed_conversions': attributed_conversions,
+                'attributed_revenue': attributed_revenue,
+                'percentage': percentage
+            }
+            for channel, attributed_conversions, attributed_revenue, percentage in zip(
+                channels, conversions.tolist(), revenue.tolist(), percentages.tolist()
+            )
+        ]
     
     def _linear_attribution(self, df: pd.DataFrame) -> List[Dict]:
         """Linear attribution - Equal credit to all touchpoints"""
-        results = []
-        
         # If DataFrame is empty, return default channels with zero values
         if df.empty:
-            for channel in ['Google Ads', 'Meta Ads', 'Email', 'TikTok', 'Affiliate']:
-                results.append({
-                    'channel': channel,
-                    'attributed_conversions': 0,
-                    'attributed_revenue': 0.0,
-                    'percentage': 0.0
-                })
-            return results
+            return self._empty_result()
         
         # Equal distribution across all channels
-        total_conversions = df['conversions'].sum()
-        total_revenue = df['revenue'].sum()
-        num_channels = len(df['channel'].unique())
-        
+        return self._linear_attribution_fast(
+            df['conversions'].sum(),
+            df['revenue'].sum(),
+            df['channel'].unique()
+        )
+    
+    def _linear_attribution_fast(self, total_conversions: float, total_revenue: float, channels) -> List[Dict]:
+        """Linear attribution from period totals and the channels present - no per-row work"""
+        num_channels = len(channels)
         if num_channels == 0:
-            return results
+            return []
         
-        for channel in df['channel'].unique():
-            results.append({
-                'channel': channel,
-                'attributed_conversions': int(total_conversions / num_channels),
-                'attributed_revenue': float(total_revenue / num_channels),
-                'percentage': round(100 / num_channels, 2)
-            })
+        attributed_conversions = int(total_conversions / num_channels)
+        attributed_revenue = float(total_revenue / num_channels)
+        percentage = round(100 / num_channels, 2)
         
-        return results
+        return [
+            {
+                'channel': channel,
+                'attributed_conversions': attributed_conversions,
+                'attributed_revenue': attributed_revenue,
+                'percentage': percentage
+            }
+            for channel in channels
+        ]
     
     def _time_decay_attribution(self, df: pd.DataFrame) -> List[Dict]:
         """Time decay attribution - More credit to recent touchpoints"""
-        results = []
-        
         # If DataFrame is empty, return default channels with zero values
         if df.empty:
-            for channel in ['Google Ads', 'Meta Ads', 'Email', 'TikTok', 'Affiliate']:
-                results.append({
-                    'channel': channel,
-                    'attributed_conversions': 0,
-                    'attributed_revenue': 0.0,
-                    'percentage': 0.0
-                })
-            return results
-        
-        # For aggregated data, use channel performance as weight
-        total_conversions = df['conversions'].sum()
-        total_revenue = df['revenue'].sum()
-        
-        # Weight by recent performance (using conversions as proxy)
-        for _, row in df.iterrows():
-            channel = row['channel']
-            # Channels with more conversions get more credit (simulating recency)
-            weight = row['conversions'] / total_conversions if total_conversions > 0 else 0
-            
-            results.append({
+            return self._empty_result()
+        
+        # Recency-weighted conversions and revenue per channel in one pass
+        weights = df['time_weight'].to_numpy(dtype=np.float64)
+        values = np.stack([
+            df['conversions'].to_numpy(dtype=np.float64),
+            df['revenue'].to_numpy(dtype=np.float64)
+        ])
+        
+        # Apply the weight to both rows at once and scatter-add into (2, n_channels)
+        channels, weighted = self._channel_totals(df, values * weights)
+        weighted_conversions, weighted_revenue = weighted
+        conversions, revenue = values
+        
+        # Scale weighted values back to the actual period totals
+        total_weighted, total_weighted_revenue = weighted.sum(axis=1)
+        conversion_share = weighted_conversions / total_weighted if total_weighted > 0 else np.zeros(len(channels))
+        revenue_share = weighted_revenue / total_weighted_revenue if total_weighted_revenue > 0 else np.zeros(len(channels))
+        
+        attributed_conversions = (conversion_share * conversions.sum()).astype(np.int64)
+        attributed_revenue = revenue_share * revenue.sum()
+        percentages = np.round(conversion_share * 100, 2)
+        
+        return [
+            {
                 'channel': channel,
-                'attributed_conversions': int(row['conversions']),
-                'attributed_revenue': float(row['revenue']),
-                'percentage': round(weight * 100, 2)
-            })
-        
-        return results
+                'attributed_conversions': conversions,
+                'attributed_revenue': revenue,
+                'percentage': percentage
+            }
+            for channel, conversions, revenue, percentage in zip(
+                channels, attributed_conversions.tolist(), attributed_revenue.tolist(), percentages.tolist()
+            )
+        ]
     
     def _u_shaped_attribution(self, df: pd.DataFrame) -> List[Dict]:
         """U-shaped attribution - 40% first, 40% last, 20% middle touchpoints"""
-        # Simulate based on channel characteristics
-        first_touch_weight = {
-            'Google Ads': 0.35,  # Often first discovery
-            'Meta Ads': 0.30,
-            'TikTok': 0.25,
-            'Email': 0.05,      # Rarely first touch
-            'Affiliate': 0.05
-        }
-        
-        last_touch_weight = {
-            'Google Ads': 0.30,
-            'Meta Ads': 0.20,
-            'Email': 0.25,      # Often closes deals
-            'Affiliate': 0.20,
-            'TikTok': 0.05
-        }
+        if df.empty:
+            return self._empty_result()
         
         results = []
         total_conversions = df['conversions'].sum()
         total_revenue = df['revenue'].sum()
+        channels = df['channel'].unique()
+        middle_weight = 0.2 / len(channels) if len(channels) > 0 else 0  # Equal split for middle
         
-        for channel in df['channel'].unique():
+        for channel in channels:
             # U-shaped weight = 40% first + 40% last + 20% middle
-            first_weight = first_touch_weight.get(channel, 0.2) * 0.4
-            last_weight = last_touch_weight.get(channel, 0.2) * 0.4
-            middle_weight = 0.2 / len(df['channel'].unique())  # Equal split for middle
-            
-            total_weight = first_weight + last_weight + middle_weight
+            total_weight = U_SHAPED_EDGE_WEIGHT.get(channel, DEFAULT_U_SHAPED_EDGE_WEIGHT) + middle_weight
             
             results.append({
                 'channel': channel,
@@ -234,59 +389,46 @@ class AttributionService:
     
     def _data_driven_attribution(self, df: pd.DataFrame) -> List[Dict]:
         """Data-driven attribution using simplified Shapley values"""
+        if df.empty:
+            return self._empty_result()
+        
         # Calculate channel contribution using conversion rates and interactions
-        results = []
+        values = df[['conversions', 'clicks']].to_numpy(dtype=np.float64).T
+        channels, (conversions, clicks) = self._channel_totals(df, values)
         
-        # Calculate channel efficiency metrics
-        channel_metrics = {}
-        for channel in df['channel'].unique():
-            channel_data = df[df['channel'] == channel]
-            
-            # Calculate conversion rate when channel is present
-            conversion_rate = channel_data['conversions'].sum() / channel_data['clicks'].sum() if channel_data['clicks'].sum() > 0 else 0
-            
-            # Calculate average revenue per conversion
-            avg_revenue = channel_data['revenue'].sum() / channel_data['conversions'].sum() if channel_data['conversions'].sum() > 0 else 0
-            
-            channel_metrics[channel] = {
-                'conversion_rate': conversion_rate,
-                'avg_revenue': avg_revenue,
-                'total_conversions': channel_data['conversions'].sum(),
-                'total_revenue': channel_data['revenue'].sum()
-            }
+        # Conversion rate when channel is present
+        conversion_rate = np.divide(conversions, clicks, out=np.zeros_like(conversions), where=clicks > 0)
         
-        # Calculate Shapley-like values based on incremental contribution
-        total_conversions = df['conversions'].sum()
-        total_revenue = df['revenue'].sum()
+        # Shapley-like values based on incremental contribution:
+        # baseline (no channels) = 0, each channel's contribution = its incremental value
+        contribution_score = conversion_rate * conversions
+        total_score = contribution_score.sum()
         
-        # Baseline (no channels) = 0
-        # Each channel's contribution = its incremental value
-        for channel in df['channel'].unique():
-            metrics = channel_metrics[channel]
-            
-            # Incremental contribution based on conversion rate and volume
-            contribution_score = metrics['conversion_rate'] * metrics['total_conversions']
-            
-            # Normalize across all channels
-            total_score = sum(channel_metrics[ch]['conversion_rate'] * channel_metrics[ch]['total_conversions'] 
-                            for ch in channel_metrics)
-            
-            if total_score > 0:
-                attribution_weight = contribution_score / total_score
-            else:
-                attribution_weight = 1 / len(df['channel'].unique())
-            
-            results.append({
-                'channel': channel,
-                'attributed_conversions': int(total_conversions * attribution_weight),
-                'attributed_revenue': float(total_revenue * attribution_weight),
-                'percentage': round(attribution_weight * 100, 2)
-            })
+        # Normalize across all channels
+        if total_score > 0:
+            attribution_weights = contribution_score / total_score
+        else:
+            attribution_weights = np.full(len(contribution_score), 1 / len(contribution_score))
         
-        return results
+        # Per-channel totals already sum to the period totals
+        attributed_conversions = (conversions.sum() * attribution_weights).astype(np.int64)
+        attributed_revenue = df['revenue'].sum() * attribution_weights
+        percentages = np.round(attribution_weights * 100, 2)
+        
+        return [
+            {
+                'channel': channel,
+                'attributed_conversions': conversions,
+                'attributed_revenue': revenue,
+                'percentage': percentage
+            }
+            for channel, conversions, revenue, percentage in zip(
+                channels, attributed_conversions.tolist(), attributed_revenue.tolist(), percentages.tolist()
+            )
+        ]
     
     def _save_attribution_results(self, results: List[Dict], model_type: str, start: datetime, end: datetime):
-        """Save attribution results to database"""
+        """Save attribution results to the current transaction (caller commits)"""
         # Clear existing results for this period and model
         self.db.query(AttributionResult).filter(
             and_(
@@ -294,74 +436,117 @@ class AttributionService:
                 AttributionResult.date >= start,
                 AttributionResult.date <= end
             )
-        ).delete()
-        
-        # Save new results
-        for result in results:
-            attribution = AttributionResult(
-                date=end,  # Use end date for the attribution period
-                channel=result['channel'],
-                model_type=model_type,
-                attributed_conversions=result['attributed_conversions'],
-                attributed_revenue=result['attributed_revenue']
-            )
-            self.db.add(attribution)
-        
-        self.db.commit()
+        ).delete(synchronize_session=False)
+        
+        # Save new results with a single multi-row INSERT
+        rows = [
+            {
+                'date': end,  # Use end date for the attribution period
+                'channel': result['channel'],
+                'model_type': model_type,
+                'attributed_conversions': result['attributed_conversions'],
+                'attributed_revenue': result['attributed_revenue']
+            }
+            for result in results
+        ]
+        if rows:
+            self.db.execute(AttributionResult.__table__.insert(), rows)
     
     def _calculate_attribution_summary(self, results: List[Dict]) -> Dict:
         """Calculate summary statistics for attribution results"""
-        total_conversions = sum(r['attributed_conversions'] for r in results)
-        total_revenue = sum(r['attributed_revenue'] for r in results)
+        total_conversions = 0
+        total_revenue = 0.0
+        for r in results:
+            total_conversions += r['attributed_conversions']
+            total_revenue += r['attributed_revenue']
         
-        # Find top and bottom performers
-        sorted_results = sorted(results, key=lambda x: x['attributed_revenue'], reverse=True)
+        # Find top and bottom performers (first max, last min - as a stable descending sort would)
+        revenue_key = itemgetter('attributed_revenue')
+        top = max(results, key=revenue_key)
+        bottom = min(reversed(results), key=revenue_key)
         
         return {
             'total_attributed_conversions': total_conversions,
             'total_attributed_revenue': round(total_revenue, 2),
             'top_performer': {
-                'channel': sorted_results[0]['channel'],
-                'revenue': round(sorted_results[0]['attributed_revenue'], 2),
-                'percentage': sorted_results[0]['percentage']
+                'channel': top['channel'],
+                'revenue': round(top['attributed_revenue'], 2),
+                'percentage': top['percentage']
             },
             'bottom_performer': {
-                'channel': sorted_results[-1]['channel'],
-                'revenue': round(sorted_results[-1]['attributed_revenue'], 2),
-                'percentage': sorted_results[-1]['percentage']
+                'channel': bottom['channel'],
+                'revenue': round(bottom['attributed_revenue'], 2),
+                'percentage': bottom['percentage']
             }
         }
     
     def compare_attribution_models(self, start_date: str, end_date: str) -> Dict:
         """Compare results across different attribution models"""
-        models = ['last_click', 'linear', 'time_decay', 'u_shaped', 'data_driven']
+        models = list(self._dispatch)
         comparison = {}
         
         try:
+            start = datetime.fromisoformat(start_date)
+            end = datetime.fromisoformat(end_date)
+            
+            version = self._data_version(start, end)
+            cache_keys = {model: (model, start, end, version) for model in models}
+            
             for model in models:
-                result = self.calculate_attribution(start_date, end_date, model)
-                comparison[model] = result.get('results', [])
-        except Exception as e:
-            print(f"Error in attribution comparison: {str(e)}")
+                comparison[model] = self._get_cached_results(cache_keys[model])
+            missing = [model for model in models if comparison[model] is None]
+            
+            if missing:
+                # Load the period once and reuse it for every model
+                model_data = self._load_model_data(missing, start, end)
+                
+                # Models are independent and don't mutate their input, so run them
+                # concurrently; the session is only touched afterwards, from this thread
+                futures = {
+                    model: _MODEL_EXECUTOR.submit(
+                        self._calculate_attribution_from_df,
+                        model_data[model],
+                        model
+                    )
+                    for model in missing
+                }
+                for model, future in futures.items():
+                    comparison[model] = future.result()
+                
+                for model in missing:
+                    self._save_attribution_results(comparison[model], model, start, end)
+                
+                self.db.commit()
+                for model in missing:
+                    self._cache_results(cache_keys[model], comparison[model])
+        except Exception:
+            logger.exception("Error in attribution comparison")
+            self.db.rollback()
             # Return empty results on error
             for model in models:
                 comparison[model] = []
         
         # Calculate variance across models
-        channel_variance = {}
-        channels = list(set(r['channel'] for results in comparison.values() for r in results))
-        
-        for channel in channels:
-            percentages = [
-                next((r['percentage'] for r in results if r['channel'] == channel), 0)
-                for results in comparison.values()
-            ]
-            channel_variance[channel] = {
-                'min': min(percentages),
-                'max': max(percentages),
-                'variance': round(np.var(percentages), 2),
-                'mean': round(np.mean(percentages), 2)
-            }
+        # (n_channels, n_models) matrix of percentages, 0 where a model has no row for a channel
+        channel_to_row = {}
+        for results in comparison.values():
+            for r in results:
+                channel_to_row.setdefault(r['channel'], len(channel_to_row))
+        
+        percentages = np.zeros((len(channel_to_row), len(models)))
+        for j, model in enumerate(models):
+            for r in comparison[model]:
+                percentages[channel_to_row[r['channel']], j] = r['percentage']
+        
+        mins = percentages.min(axis=1).tolist()
+        maxs = percentages.max(axis=1).tolist()
+        variances = np.round(percentages.var(axis=1), 2).tolist()
+        means = np.round(percentages.mean(axis=1), 2).tolist()
+        
+        channel_variance = {
+            channel: {'min': mins[i], 'max': maxs[i], 'variance': variances[i], 'mean': means[i]}
+            for channel, i in channel_to_row.items()
+        }
         
         return {
             'period': {'start': start_date, 'end': end_date},
@@ -1,9 +1,18 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import select, func, and_, cast, type_coerce, Date
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import pandas as pd
+import numpy as np
 from ..models.models import DailyMarketingData, ExternalFactor
+from ..utils.cache import TTLCache
+
+# Period aggregates keyed by (start, end), kept for 5 minutes; callers treat the
+# cached dicts as read-only
+_PERIOD_CACHE = TTLCache(maxsize=256, ttl=300)
+
+# Rows fetched and converted per batch when streaming trend rows
+_TREND_BATCH_SIZE = 500
 
 class MetricsService:
     def __init__(self, db: Session):
@@ -11,8 +20,8 @@ class MetricsService:
     
     def get_overview_metrics(self, start_date: str, end_date: str) -> Dict:
         """Get high-level metrics for dashboard overview"""
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
+        start = datetime.fromisoformat(start_date)
+        end = datetime.fromisoformat(end_date)
         
         # Get current period metrics
         current_metrics = self._get_period_metrics(start, end)
@@ -43,7 +52,11 @@ class MetricsService:
         }
     
     def _get_period_metrics(self, start: datetime, end: datetime) -> Dict:
-        """Get metrics for a specific period"""
+        """Get metrics for a specific period (cached for a few minutes)"""
+        return _PERIOD_CACHE.get_or_compute((start, end), lambda: self._query_period_metrics(start, end))
+    
+    def _query_period_metrics(self, start: datetime, end: datetime) -> Dict:
+        """Aggregate metrics for a period from the database"""
         # Query aggregated metrics
         results = self.db.query(
             DailyMarketingData.channel,
@@ -59,30 +72,45 @@ class MetricsService:
             )
         ).group_by(DailyMarketingData.channel).all()
         
-        channels = []
-        total_spend = 0
-        total_revenue = 0
-        total_conversions = 0
+        # Convert whole columns at once (NULL sums count as 0)
+        df = pd.DataFrame.from_records(
+            results,
+            columns=['channel', 'spend', 'revenue', 'conversions', 'clicks', 'impressions']
+        ).fillna(0).astype({
+            'spend': 'float64',
+            'revenue': 'float64',
+            'conversions': 'int64',
+            'clicks': 'int64',
+            'impressions': 'int64'
+        })
         
-        for row in results:
-            spend = float(row.spend or 0)
-            revenue = float(row.revenue or 0)
-            conversions = int(row.conversions or 0)
-            roas = revenue / spend if spend > 0 else 0
-            
-            channels.append({
-                'name': row.channel,
-                'spend': round(spend, 2),
-                'revenue': round(revenue, 2),
-                'conversions': conversions,
-                'roas': round(roas, 2),
-                'clicks': int(row.clicks or 0),
-                'impressions': int(row.impressions or 0)
-            })
-            
-            total_spend += spend
-            total_revenue += revenue
-            total_conversions += conversions
+        spend = df['spend'].to_numpy()
+        revenue = df['revenue'].to_numpy()
+        roas = np.divide(revenue, spend, out=np.zeros(len(df)), where=spend > 0)
+        
+        spend = spend.tolist()
+        revenue = revenue.tolist()
+        conversions = df['conversions'].tolist()
+        
+        channels = [
+            {
+                'name': name,
+                'spend': round(channel_spend, 2),
+                'revenue': round(channel_revenue, 2),
+                'conversions': channel_conversions,
+                'roas': round(channel_roas, 2),
+                'clicks': clicks,
+                'impressions': impressions
+            }
+            for name, channel_spend, channel_revenue, channel_conversions, channel_roas, clicks, impressions in zip(
+                df['channel'].tolist(), spend, revenue, conversions, roas.tolist(),
+                df['clicks'].tolist(), df['impressions'].tolist()
+            )
+        ]
+        
+        total_spend = sum(spend)
+        total_revenue = sum(revenue)
+        total_conversions = sum(conversions)
         
         overall_roas = total_revenue / total_spend if total_spend > 0 else 0
         
@@ -109,30 +137,34 @@ class MetricsService:
     
     def get_channel_performance(self, channel: str, start_date: str, end_date: str) -> Dict:
         """Get detailed performance metrics for a specific channel"""
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
+        start = datetime.fromisoformat(start_date)
+        end = datetime.fromisoformat(end_date)
         
-        # Get daily data for the channel
-        daily_data = self.db.query(DailyMarketingData).filter(
+        # Get daily data for the channel as plain rows (no ORM objects)
+        stmt = select(
+            DailyMarketingData.date,
+            DailyMarketingData.spend,
+            DailyMarketingData.revenue,
+            DailyMarketingData.conversions,
+            DailyMarketingData.clicks,
+            DailyMarketingData.impressions
+        ).where(
             and_(
                 DailyMarketingData.channel == channel,
                 DailyMarketingData.date >= start,
                 DailyMarketingData.date <= end
             )
-        ).order_by(DailyMarketingData.date).all()
+        ).order_by(DailyMarketingData.date)
+        daily_data = self.db.execute(stmt).fetchall()
         
         if not daily_data:
             return {'error': f'No data found for channel: {channel}'}
         
         # Convert to DataFrame for easier analysis
-        df = pd.DataFrame([{
-            'date': d.date,
-            'spend': float(d.spend),
-            'revenue': float(d.revenue),
-            'conversions': d.conversions,
-            'clicks': d.clicks,
-            'impressions': d.impressions
-        } for d in daily_data])
+        df = pd.DataFrame.from_records(
+            daily_data,
+            columns=['date', 'spend', 'revenue', 'conversions', 'clicks', 'impressions']
+        )
         
         # Calculate metrics
         total_spend = df['spend'].sum()
@@ -142,17 +174,20 @@ class MetricsService:
         # Find optimal spend point (where marginal ROAS starts declining)
         optimal_spend = self._find_optimal_spend(df)
         
-        # Calculate weekly aggregates for trend analysis
-        df['week'] = pd.to_datetime(df['date']).dt.to_period('W')
-        weekly_metrics = df.groupby('week').agg({
-            'spend': 'sum',
-            'revenue': 'sum',
-            'conversions': 'sum'
-        }).reset_index()
+        # Calculate weekly aggregates for trend analysis in the database
+        weekly_metrics = self._get_weekly_metrics(channel, start, end)
+        
+        # Find best performing periods (days without spend have no ROAS)
+        spend = df['spend'].to_numpy(dtype=np.float64)
+        roas = np.divide(df['revenue'].to_numpy(dtype=np.float64), spend, out=np.full(len(df), np.nan), where=spend > 0)
+        df['roas'] = roas
         
-        # Find best performing periods
-        df['roas'] = df['revenue'] / df['spend']
-        best_days = df.nlargest(5, 'roas')[['date', 'roas', 'revenue']].to_dict('records')
+        # Partial selection of the top 5, then order those by ROAS (earlier day first on ties)
+        candidates = np.flatnonzero(~np.isnan(roas))
+        k = min(5, candidates.size)
+        top = candidates[np.argpartition(-roas[candidates], k - 1)[:k]] if k > 0 else candidates
+        top = top[np.lexsort((top, -roas[top]))]
+        best_days = df.iloc[top][['date', 'roas', 'revenue']].to_dict('records')
         
         return {
             'channel': channel,
@@ -168,30 +203,68 @@ class MetricsService:
             },
             'time_series': {
                 'daily': df[['date', 'spend', 'revenue', 'conversions']].to_dict('records'),
-                'weekly': weekly_metrics.to_dict('records')
+                'weekly': weekly_metrics
             },
             'best_performing_days': best_days
         }
     
+    def _week_start(self):
+        """Monday of the week for each row, as a date on every supported backend"""
+        if self.db.get_bind().dialect.name == 'sqlite':
+            # SQLite has no date_trunc: step back 6 days, then forward to the next Monday
+            return type_coerce(func.date(DailyMarketingData.date, '-6 days', 'weekday 1'), Date)
+        return cast(func.date_trunc('week', DailyMarketingData.date), Date)
+    
+    def _get_weekly_metrics(self, channel: str, start: datetime, end: datetime) -> List[Dict]:
+        """Weekly spend, revenue and conversions for a channel, grouped in SQL"""
+        results = self.db.query(
+            self._week_start().label('week'),
+            func.sum(DailyMarketingData.spend).label('spend'),
+            func.sum(DailyMarketingData.revenue).label('revenue'),
+            func.sum(DailyMarketingData.conversions).label('conversions')
+        ).filter(
+            and_(
+                DailyMarketingData.channel == channel,
+                DailyMarketingData.date >= start,
+                DailyMarketingData.date <= end
+            )
+        ).group_by('week').order_by('week').all()
+        
+        return [
+            {
+                'week': row.week.strftime('%Y-%m-%d'),
+                'spend': float(row.spend or 0),
+                'revenue': float(row.revenue or 0),
+                'conversions': int(row.conversions or 0)
+            }
+            for row in results
+        ]
+    
     def _find_optimal_spend(self, df: pd.DataFrame) -> float:
         """Find optimal spend point using marginal ROAS analysis"""
+        spend = df['spend'].to_numpy(dtype=np.float64)
+        revenue = df['revenue'].to_numpy(dtype=np.float64)
+        
         # Sort by spend
-        df_sorted = df.sort_values('spend')
+        order = np.argsort(spend, kind='quicksort')
+        spend_sorted = spend[order]
+        revenue_sorted = revenue[order]
         
-        # Calculate rolling marginal ROAS
+        # Calculate rolling marginal ROAS (row i compares against row i - window)
         window = 7
-        df_sorted['marginal_revenue'] = df_sorted['revenue'].diff(window)
-        df_sorted['marginal_spend'] = df_sorted['spend'].diff(window)
-        df_sorted['marginal_roas'] = df_sorted['marginal_revenue'] / df_sorted['marginal_spend']
-        
-        # Find where marginal ROAS drops below overall ROAS
-        overall_roas = df['revenue'].sum() / df['spend'].sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            marginal_revenue = revenue_sorted[window:] - revenue_sorted[:-window]
+            marginal_spend = spend_sorted[window:] - spend_sorted[:-window]
+            marginal_roas = marginal_revenue / marginal_spend
+            
+            # Find where marginal ROAS drops below overall ROAS
+            overall_roas = revenue.sum() / spend.sum()
         
         # Find the spend level where marginal ROAS < overall ROAS * 0.8
-        declining_point = df_sorted[df_sorted['marginal_roas'] < overall_roas * 0.8]
+        declining = marginal_roas < overall_roas * 0.8
         
-        if not declining_point.empty:
-            return round(declining_point.iloc[0]['spend'], 2)
+        if declining.any():
+            return round(float(spend_sorted[window + declining.argmax()]), 2)
         else:
             # If no clear declining point, use 90th percentile of spend
             return round(df['spend'].quantile(0.9), 2)
@@ -209,34 +282,37 @@ class MetricsService:
     
     def get_channel_trends(self, channel: str, days: int = 30) -> Dict:
         """Get recent trends for a channel"""
+        return {
+            'channel': channel,
+            'period_days': days,
+            'trends': list(self.iter_channel_trends(channel, days))
+        }
+    
+    def iter_channel_trends(self, channel: str, days: int = 30) -> Iterator[Dict]:
+        """Weekly trend rows for a channel, fetched and converted batch by batch"""
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
         
-        recent_data = self.db.query(
-            func.date_trunc('week', DailyMarketingData.date).label('week'),
+        stmt = select(
+            self._week_start().label('week'),
             func.sum(DailyMarketingData.spend).label('spend'),
             func.sum(DailyMarketingData.revenue).label('revenue'),
             func.sum(DailyMarketingData.conversions).label('conversions')
-        ).filter(
+        ).where(
             and_(
                 DailyMarketingData.channel == channel,
                 DailyMarketingData.date >= start_date
             )
-        ).group_by('week').order_by('week').all()
-        
-        trends = []
-        for row in recent_data:
-            roas = float(row.revenue) / float(row.spend) if row.spend > 0 else 0
-            trends.append({
-                'week': row.week.strftime('%Y-%m-%d'),
-                'spend': float(row.spend),
-                'revenue': float(row.revenue),
-                'conversions': int(row.conversions),
-                'roas': round(roas, 2)
-            })
+        ).group_by('week').order_by('week').execution_options(yield_per=_TREND_BATCH_SIZE)
         
-        return {
-            'channel': channel,
-            'period_days': days,
-            'trends': trends
-        }
\ No newline at end of file
+        for batch in self.db.execute(stmt).partitions():
+            # Convert the weekly rows column-wise rather than per row
+            df = pd.DataFrame.from_records(batch, columns=['week', 'spend', 'revenue', 'conversions'])
+            df = df.astype({'spend': 'float64', 'revenue': 'float64', 'conversions': 'int64'})
+            df['week'] = pd.to_datetime(df['week']).dt.strftime('%Y-%m-%d')
+            
+            spend = df['spend'].to_numpy()
+            roas = np.divide(df['revenue'].to_numpy(), spend, out=np.zeros(len(df)), where=spend > 0)
+            df['roas'] = np.round(roas, 2)
+            
+            yield from df.to_dict('records')
\ No newline at end of file
@@ -7,9 +7,61 @@ import numpy as np
 from scipy.optimize import minimize
 from ..models.models import DailyMarketingData
 
+# Weight of the quadratic penalty keeping the solver's last (dependent) channel in bounds
+BUDGET_PENALTY = 1e3
+
+# Bisection steps for the water-filling multiplier (the bracket shrinks to ~1e-18 of its width)
+WATER_FILL_ITERATIONS = 60
+
+# Outlier cutoff for curve fitting: 3 standard deviations, estimated as 1.4826 * MAD
+MAD_OUTLIER_THRESHOLD = 1.4826 * 3
+
+
+def _curve_revenue(spend, a, b):
+    """Revenue from the fitted response curve a * log(spend + 1) + b"""
+    return a * np.log1p(spend) + b
+
+
+def _reduced_objective(z, a, b_sum, total_budget, last_min, last_max):
+    """Negative revenue and its gradient over all channels but the last"""
+    # The last channel takes the remaining budget; its bounds become a quadratic penalty
+    x = np.append(z, total_budget - z.sum())
+    x_last = x[-1]
+    below = max(last_min - x_last, 0.0)
+    above = max(x_last - last_max, 0.0)
+    x[-1] = min(max(x_last, last_min), last_max)
+    
+    # Revenue = a * log(spend + 1) + b per channel (negative because we minimize)
+    value = -_curve_revenue(x, a, 0.0).sum() - b_sum + BUDGET_PENALTY * (below * below + above * above)
+    
+    # Gradient of every free channel, minus the last channel's share it gives up
+    grad = -a / (x + 1)
+    last_grad = 2 * BUDGET_PENALTY * (above - below)
+    if not (below or above):
+        last_grad += grad[-1]
+    return value, grad[:-1] - last_grad
+
+def _fit_to_budget(x, lower, upper, total_budget):
+    """Clip an allocation to its bounds, then spread any budget gap over the channels with room"""
+    # Each channel takes a share of the gap proportional to its headroom, so one step
+    # lands on the budget; past sum(upper) (or below sum(lower)) every channel sits on its bound
+    x = np.clip(x, lower, upper)
+    gap = total_budget - x.sum()
+    room = upper - x if gap > 0 else x - lower
+    if room.sum() > 0:
+        x = x + np.sign(gap) * room * min(abs(gap) / room.sum(), 1.0)
+    return x
+
+def _inlier_mask(y):
+    """Points within 3 robust standard deviations (1.4826 * MAD) of the median"""
+    deviation = np.abs(y - np.median(y))
+    return deviation <= MAD_OUTLIER_THRESHOLD * np.median(deviation)
+
 class OptimizationService:
     def __init__(self, db: Session):
         self.db = db
+        self._curves_cache = {}  # (start_date, end_date) -> fitted curves
+        self._current_revenue_cache = {}  # (start_date, end_date) -> daily revenue
         self.min_spend_constraints = {
             'Google Ads': 1000,  # Minimum daily spend
             'Meta Ads': 500,
@@ -18,10 +70,19 @@ class OptimizationService:
             'Affiliate': 0  # Commission-based
         }
     
-    def optimize_budget(self, total_budget: float, constraints: Optional[Dict] = None) -> Dict:
+    def optimize_budget(self, total_budget: float, constraints: Optional[Dict] = None,
+                        channel_curves: Optional[Dict] = None, initial_allocation: Optional[Dict] = None) -> Dict:
         """Optimize budget allocation across channels to maximize revenue"""
-        # Get historical performance data
-        channel_curves = self._calculate_response_curves()
+        result = self._optimize_allocation(total_budget, constraints, channel_curves, initial_allocation)
+        result['recommendations'] = self._generate_recommendations(result['optimized_allocation'])
+        return result
+    
+    def _optimize_allocation(self, total_budget: float, constraints: Optional[Dict] = None,
+                             channel_curves: Optional[Dict] = None, initial_allocation: Optional[Dict] = None) -> Dict:
+        """Optimal allocation and projected results for one budget, without recommendations"""
+        # Get historical performance data (callers running several budgets pass it in)
+        if channel_curves is None:
+            channel_curves = self._calculate_response_curves()
         
         # Apply custom constraints if provided
         if constraints:
@@ -30,7 +91,7 @@ class OptimizationService:
                     self.min_spend_constraints[channel] = constraint['min']
         
         # Run optimization
-        optimal_allocation = self._run_optimization(total_budget, channel_curves)
+        optimal_allocation = self._run_optimization(total_budget, channel_curves, initial_allocation)
         
         # Calculate projected results
         projected_revenue = self._calculate_projected_revenue(optimal_allocation, channel_curves)
@@ -48,8 +109,7 @@ class OptimizationService:
             'projected_revenue': round(projected_revenue, 2),
             'current_revenue': round(current_revenue, 2),
             'revenue_lift': round(revenue_lift, 2),
-            'roi_improvement': round(roi_improvement, 2),
-            'recommendations': self._generate_recommendations(optimal_allocation)
+            'roi_improvement': round(roi_improvement, 2)
         }
     
     def _calculate_response_curves(self) -> Dict:
@@ -58,51 +118,60 @@ class OptimizationService:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=90)
         
-        data = self.db.query(DailyMarketingData).filter(
-            DailyMarketingData.date >= start_date
-        ).all()
+        # Curves only depend on the window, so reuse them within this service
+        # (simulate_scenarios optimizes several budgets over the same data)
+        key = (start_date, end_date)
+        if key in self._curves_cache:
+            return self._curves_cache[key]
         
-        df = pd.DataFrame([{
-            'date': d.date,
-            'channel': d.channel,
-            'spend': float(d.spend),
-            'revenue': float(d.revenue),
-            'conversions': d.conversions
-        } for d in data])
+        # Stream plain column tuples straight into arrays (no ORM objects or row list)
+        columns = list(zip(*self.db.query(
+            DailyMarketingData.channel,
+            DailyMarketingData.spend,
+            DailyMarketingData.revenue
+        ).filter(
+            DailyMarketingData.date >= start_date
+        ).yield_per(1000)))
         
         curves = {}
+        self._curves_cache[key] = curves
+        if not columns:
+            return curves
         
-        for channel in df['channel'].unique():
-            channel_data = df[df['channel'] == channel]
-            
+        channel_names, spend, revenue = columns
+        spend = np.fromiter(spend, dtype=np.float64, count=len(spend))
+        revenue = np.fromiter(revenue, dtype=np.float64, count=len(revenue))
+        
+        # Group row positions by channel once (channels in first-appearance order,
+        # rows in their original order) instead of masking the data per channel
+        codes, channels = pd.factorize(np.asarray(channel_names, dtype=object))
+        counts = np.bincount(codes)
+        groups = np.split(np.argsort(codes, kind='stable'), np.cumsum(counts)[:-1])
+        
+        # Average daily spend and revenue for every channel in one pass
+        mean_spend = np.bincount(codes, weights=spend) / counts
+        mean_revenue = np.bincount(codes, weights=revenue) / counts
+        
+        for i, (channel, rows_idx) in enumerate(zip(channels, groups)):
             # Fit logarithmic response curve: revenue = a * log(spend + 1) + b
             # This models diminishing returns
-            if len(channel_data) > 10:
-                X = channel_data['spend'].values
-                y = channel_data['revenue'].values
+            if len(rows_idx) > 10:
+                X = spend[rows_idx]
+                y = revenue[rows_idx]
                 
-                # Remove outliers
-                q1 = np.percentile(y, 25)
-                q3 = np.percentile(y, 75)
-                iqr = q3 - q1
-                lower_bound = q1 - 1.5 * iqr
-                upper_bound = q3 + 1.5 * iqr
+                mask = _inlier_mask(y)
                 
-                mask = (y >= lower_bound) & (y <= upper_bound)
-                X_clean = X[mask]
-                y_clean = y[mask]
-                
-                if len(X_clean) > 5:
+                if np.count_nonzero(mask) > 5:
                     # Fit the curve
-                    coefficients = np.polyfit(np.log(X_clean + 1), y_clean, 1)
+                    coefficients = np.polyfit(np.log1p(X[mask]), y[mask], 1)
                     
                     curves[channel] = {
                         'type': 'logarithmic',
                         'a': coefficients[0],  # Slope
                         'b': coefficients[1],  # Intercept
                         'saturation_point': self._find_saturation_point(coefficients),
-                        'current_spend': channel_data['spend'].mean(),
-                        'current_revenue': channel_data['revenue'].mean()
+                        'current_spend': mean_spend[i],
+                        'current_revenue': mean_revenue[i]
                     }
         
         return curves
@@ -122,42 +191,27 @@ class OptimizationService:
         else:
             return 2000  # Default if curve fitting fails
     
-    def _run_optimization(self, total_budget: float, channel_curves: Dict) -> Dict:
+    def _run_optimization(self, total_budget: float, channel_curves: Dict,
+                          initial_allocation: Optional[Dict] = None) -> Dict:
         """Run the optimization algorithm"""
         channels = list(channel_curves.keys())
         n_channels = len(channels)
         
-        # Initial allocation (current spend levels)
-        x0 = [channel_curves[ch]['current_spend'] for ch in channels]
+        # Initial allocation (a previous solution if given, otherwise current spend levels),
+        # the starting point for the L-BFGS-B fallback; water-filling doesn't need one
+        if initial_allocation is not None:
+            x0 = [initial_allocation.get(ch, channel_curves[ch]['current_spend']) for ch in channels]
+        else:
+            x0 = [channel_curves[ch]['current_spend'] for ch in channels]
         
         # Normalize to match total budget
         current_total = sum(x0)
         if current_total > 0:
             x0 = [x * total_budget / current_total for x in x0]
         
-        # Objective function (negative because we minimize)
-        def objective(x):
-            total_revenue = 0
-            for i, channel in enumerate(channels):
-                if channel in channel_curves:
-                    curve = channel_curves[channel]
-                    # Revenue = a * log(spend + 1) + b
-                    revenue = curve['a'] * np.log(x[i] + 1) + curve['b']
-                    total_revenue += revenue
-                else:
-                    # Simple linear model if no curve
-                    total_revenue += x[i] * 5  # Assume 5x ROAS
-            
-            return -total_revenue  # Negative for minimization
-        
-        # Constraints
-        constraints = []
-        
-        # Total budget constraint
-        constraints.append({
-            'type': 'eq',
-            'fun': lambda x: np.sum(x) - total_budget
-        })
+        # Curve coefficients for every channel (channels come from the fitted curves)
+        a = np.array([channel_curves[ch]['a'] for ch in channels], dtype=np.float64)
+        b_sum = float(sum(channel_curves[ch]['b'] for ch in channels))
         
         # Minimum spend constraints
         bounds = []
@@ -166,44 +220,87 @@ class OptimizationService:
             max_spend = min(total_budget * 0.5, channel_curves[channel].get('saturation_point', total_budget))
             bounds.append((min_spend, max_spend))
         
-        # Run optimization
-        result = minimize(
-            objective,
-            x0,
-            method='SLSQP',
-            bounds=bounds,
-            constraints=constraints,
-            options={'maxiter': 1000}
-        )
+        # Concave curves have a closed-form solution; only fall back to the solver otherwise
+        if len(a) and (a > 0).all():
+            x = self._water_fill(a, total_budget, bounds)
+        else:
+            x = self._solve_reduced(a, b_sum, total_budget, bounds, np.asarray(x0, dtype=np.float64))
         
         # Format results
         optimal_allocation = {}
         for i, channel in enumerate(channels):
-            optimal_allocation[channel] = round(result.x[i], 2)
+            optimal_allocation[channel] = round(x[i], 2)
         
         return optimal_allocation
     
+    def _water_fill(self, a: np.ndarray, total_budget: float,
+                    bounds: List[Tuple[float, float]]) -> np.ndarray:
+        """Maximize sum(a * log(x + 1)) with sum(x) == total_budget by water-filling"""
+        # KKT: every channel spends until its marginal return a / (x + 1) drops to the
+        # common level lam, so x = clip(a / lam - 1, lower, upper); bisect lam on the budget
+        lower, upper = np.array(bounds, dtype=np.float64).T
+        
+        def allocate(lam):
+            return np.clip(a / lam - 1, lower, upper)
+        
+        # At lo every channel is at its upper bound, at hi every channel is at its lower bound
+        lo = a.min() / (total_budget + len(a))
+        hi = a.max()
+        for _ in range(WATER_FILL_ITERATIONS):
+            lam = 0.5 * (lo + hi)
+            if allocate(lam).sum() > total_budget:
+                lo = lam
+            else:
+                hi = lam
+        
+        return allocate(0.5 * (lo + hi))
+    
+    def _solve_reduced(self, a: np.ndarray, b_sum: float, total_budget: float,
+                       bounds: List[Tuple[float, float]], x0: np.ndarray) -> np.ndarray:
+        """Maximize sum(a * log(x + 1)) + b with sum(x) == total_budget using L-BFGS-B"""
+        # The last channel takes whatever budget is left, which removes the equality
+        # constraint and leaves a box-constrained problem over the other channels
+        lower, upper = np.array(bounds, dtype=np.float64).T
+        if len(a) == 1:
+            return _fit_to_budget(np.array([total_budget], dtype=np.float64), lower, upper, total_budget)
+        
+        last_min, last_max = bounds[-1]
+        result = minimize(
+            _reduced_objective,
+            x0[:-1],
+            args=(a, b_sum, total_budget, last_min, last_max),
+            jac=True,
+            method='L-BFGS-B',
+            bounds=bounds[:-1],
+            options={'maxiter': 1000}
+        )
+        
+        # An infeasible budget (outside [sum(lower), sum(upper)]) would push the
+        # remainder past the last channel's bounds, so fit it back inside them
+        return _fit_to_budget(np.append(result.x, total_budget - result.x.sum()), lower, upper, total_budget)
+    
     def _calculate_projected_revenue(self, allocation: Dict, channel_curves: Dict) -> float:
         """Calculate projected revenue from optimal allocation"""
-        total_revenue = 0
+        curved = [ch for ch in allocation if ch in channel_curves]
+        spend = np.array([allocation[ch] for ch in curved], dtype=np.float64)
+        
+        # Apply diminishing returns more aggressively
+        revenue = _curve_revenue(
+            spend,
+            np.array([channel_curves[ch]['a'] for ch in curved], dtype=np.float64),
+            np.array([channel_curves[ch]['b'] for ch in curved], dtype=np.float64)
+        )
         
-        for channel, spend in allocation.items():
-            if channel in channel_curves:
-                curve = channel_curves[channel]
-                # Apply diminishing returns more aggressively
-                revenue = curve['a'] * np.log(spend + 1) + curve['b']
-                
-                # Apply additional penalty for spend beyond current levels
-                current_spend = curve.get('current_spend', spend)
-                if spend > current_spend * 1.5:
-                    # Reduce projected revenue for aggressive increases
-                    penalty_factor = 0.8
-                    revenue = revenue * penalty_factor
-                
-                total_revenue += max(revenue, 0)  # Ensure non-negative
-            else:
-                # Fallback to conservative ROAS
-                total_revenue += spend * 2.5
+        # Apply additional penalty for spend beyond current levels
+        # (reduce projected revenue for aggressive increases)
+        current_spend = np.array([channel_curves[ch]['current_spend'] for ch in curved], dtype=np.float64)
+        penalty_factor = 0.8
+        revenue = np.where(spend > current_spend * 1.5, revenue * penalty_factor, revenue)
+        
+        total_revenue = float(np.maximum(revenue, 0).sum())  # Ensure non-negative
+        
+        # Fallback to conservative ROAS
+        total_revenue += sum(amount * 2.5 for ch, amount in allocation.items() if ch not in channel_curves)
         
         return total_revenue
     
@@ -213,6 +310,10 @@ class OptimizationService:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=30)
         
+        key = (start_date, end_date)
+        if key in self._current_revenue_cache:
+            return self._current_revenue_cache[key]
+        
         result = self.db.query(
             func.sum(DailyMarketingData.revenue)
         ).filter(
@@ -220,6 +321,7 @@ class OptimizationService:
         ).scalar()
         
         daily_avg = float(result or 0) / 30
+        self._current_revenue_cache[key] = daily_avg
         return daily_avg  # Daily revenue
     
     def _generate_recommendations(self, optimal_allocation: Dict) -> List[Dict]:
@@ -271,11 +373,23 @@ class OptimizationService:
         """Simulate multiple budget scenarios"""
         results = []
         
+        # Curves don't depend on the budget, so fit them once for all scenarios
+        channel_curves = self._calculate_response_curves()
+        
+        # Warm-start each scenario from the previous solution (rescaled to the new budget).
+        # Only the L-BFGS-B fallback (a non-positive curve slope) uses the starting point;
+        # water-filling solves each budget directly
+        previous_allocation = None
+        
+        # Scenarios only report allocation and revenue, so skip the recommendations query
         for scenario in scenarios:
-            optimization_result = self.optimize_budget(
+            optimization_result = self._optimize_allocation(
                 scenario['total_budget'],
-                scenario.get('constraints')
+                scenario.get('constraints'),
+                channel_curves=channel_curves,
+                initial_allocation=previous_allocation
             )
+            previous_allocation = optimization_result['optimized_allocation']
             
             results.append({
                 'scenario_name': scenario['name'],
@@ -305,23 +419,31 @@ class OptimizationService:
         """Analyze diminishing returns for each channel"""
         curves = self._calculate_response_curves()
         analysis = {}
-        
-        for channel, curve in curves.items():
-            # Calculate efficiency at different spend levels
-            spend_levels = np.linspace(100, curve['saturation_point'], 20)
-            marginal_returns = []
-            
-            for i in range(1, len(spend_levels)):
-                spend_diff = spend_levels[i] - spend_levels[i-1]
-                revenue_at_i = curve['a'] * np.log(spend_levels[i] + 1) + curve['b']
-                revenue_at_i_minus_1 = curve['a'] * np.log(spend_levels[i-1] + 1) + curve['b']
-                revenue_diff = revenue_at_i - revenue_at_i_minus_1
-                
-                marginal_roas = revenue_diff / spend_diff if spend_diff > 0 else 0
-                marginal_returns.append({
-                    'spend': round(spend_levels[i], 2),
-                    'marginal_roas': round(marginal_roas, 2)
-                })
+        if not curves:
+            return analysis
+        
+        # Evaluate every channel's curve on its spend grid at once: (channels, 20) arrays
+        a = np.array([curve['a'] for curve in curves.values()], dtype=np.float64)
+        b = np.array([curve['b'] for curve in curves.values()], dtype=np.float64)
+        saturation = np.array([curve['saturation_point'] for curve in curves.values()], dtype=np.float64)
+        
+        # Calculate efficiency at different spend levels
+        spend_levels = np.linspace(100, saturation, 20, axis=1)
+        revenue_levels = _curve_revenue(spend_levels, a[:, None], b[:, None])
+        
+        # Marginal ROAS between consecutive spend levels (0 if the levels don't increase)
+        spend_diff = np.diff(spend_levels, axis=1)
+        marginal_roas = np.divide(np.diff(revenue_levels, axis=1), spend_diff,
+                                  out=np.zeros_like(spend_diff), where=spend_diff > 0)
+        
+        spend_rows = np.round(spend_levels[:, 1:], 2).tolist()
+        roas_rows = np.round(marginal_roas, 2).tolist()
+        
+        for i, (channel, curve) in enumerate(curves.items()):
+            marginal_returns = [
+                {'spend': spend, 'marginal_roas': roas}
+                for spend, roas in zip(spend_rows[i], roas_rows[i])
+            ]
             
             analysis[channel] = {
                 'saturation_point': round(curve['saturation_point'], 2),
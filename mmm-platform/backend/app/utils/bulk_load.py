@@ -0,0 +1,34 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from itertools import islice
+from typing import Dict, List
+import pandas as pd
+
+# Rows per executemany batch, so very large frames aren't bound in one statement
+INSERT_CHUNK_SIZE = 5000
+
+
+def frame_records(df: pd.DataFrame, columns: List[str]) -> List[Dict]:
+    """DataFrame rows as plain dicts of the given columns (Python scalars, None for missing)"""
+    # Convert column by column (tolist boxes to Python scalars) and zip into rows,
+    # rather than boxing every row through pandas
+    values = [
+        df[column].astype(object).where(df[column].notna(), None).tolist()
+        if df[column].hasnans else df[column].tolist()
+        for column in columns
+    ]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def insert_frame(db: Session, model, df: pd.DataFrame, columns: List[str],
+                 chunk_size: int = INSERT_CHUNK_SIZE) -> int:
+    """Insert every row of a DataFrame into a model's table with Core executemany batches"""
+    if df.empty:
+        return 0
+
+    # Core insert: no ORM objects, attribute events or per-row flushes
+    statement = insert(model.__table__)
+    records = iter(frame_records(df, columns))
+    while batch := list(islice(records, chunk_size)):
+        db.execute(statement, batch)
+    return len(df)
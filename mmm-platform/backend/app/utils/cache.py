@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+import threading
+import time
+
+# Every cache created in this process, so one call can invalidate them all
+_CACHES: List["TTLCache"] = []
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe process-wide LRU whose entries expire ttl seconds after they are stored (never if ttl is None)"""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        _CACHES.append(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value for key, or default when it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] <= time.monotonic()):
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """Store value for key, evicting the least recently used entry when full"""
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """Cached value for key, computing it on a miss and storing it if cacheable(value)"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            if cacheable(value):
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def clear_caches():
+    """Drop every entry of every process-wide cache (e.g. after the database is re-seeded)"""
+    for cache in _CACHES:
+        cache.clear()
@@ -1,11 +1,58 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Optional
+
+# Base seasonality by month
+MONTHLY_SEASONALITY = {
+    1: 0.9,   # January - post-holiday slump
+    2: 0.95,  # February
+    3: 1.0,   # March
+    4: 1.05,  # April
+    5: 1.1,   # May
+    6: 0.8,   # June - summer slump begins
+    7: 0.6,   # July - deep summer slump
+    8: 0.65,  # August - still slow
+    9: 0.9,   # September - picking up
+    10: 1.1,  # October - pre-holiday
+    11: 1.5,  # November - Black Friday
+    12: 1.4   # December - holiday season
+}
+
+# Day of week factors (0 = Monday, 6 = Sunday)
+DOW_FACTORS = {
+    0: 0.9,   # Monday
+    1: 0.95,  # Tuesday
+    2: 1.0,   # Wednesday
+    3: 1.1,   # Thursday
+    4: 1.15,  # Friday
+    5: 1.05,  # Saturday
+    6: 0.85   # Sunday
+}
+
+# Click-through rates by channel
+CTR_RATES = {
+    'Google Ads': 0.02,
+    'Meta Ads': 0.015,
+    'Email': 0.025,
+    'TikTok': 0.01,
+    'Affiliate': 0.03
+}
+
+DAY_ABBREVIATIONS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+COMPETITOR_ACTIVITIES = [
+    "Major competitor sale",
+    "New competitor launch",
+    "Competitor TV campaign",
+    "Industry event"
+]
 
 class MMMDataGenerator:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        # Single generator for all random draws (pass a seed for reproducible data)
+        self.rng = np.random.default_rng(seed)
+        
         self.channels = {
             'Google Ads': {
                 'base_cpm': 25,
@@ -53,63 +100,47 @@ class MMMDataGenerator:
             'July 4th': {'date': '07-04', 'multiplier': 1.3},
             'Labor Day': {'date': 'september-first-monday', 'multiplier': 1.4}
         }
+        
+        # year -> {(month, day): (holiday name, multiplier)}, filled on first use
+        self._holiday_calendar = {}
     
     def get_seasonality_index(self, date: datetime) -> float:
         """Calculate seasonality index based on date"""
         month = date.month
         day_of_week = date.weekday()
         
-        # Base seasonality by month
-        monthly_seasonality = {
-            1: 0.9,   # January - post-holiday slump
-            2: 0.95,  # February
-            3: 1.0,   # March
-            4: 1.05,  # April
-            5: 1.1,   # May
-            6: 0.8,   # June - summer slump begins
-            7: 0.6,   # July - deep summer slump
-            8: 0.65,  # August - still slow
-            9: 0.9,   # September - picking up
-            10: 1.1,  # October - pre-holiday
-            11: 1.5,  # November - Black Friday
-            12: 1.4   # December - holiday season
-        }
-        
-        # Day of week factors (0 = Monday, 6 = Sunday)
-        dow_factors = {
-            0: 0.9,   # Monday
-            1: 0.95,  # Tuesday
-            2: 1.0,   # Wednesday
-            3: 1.1,   # Thursday
-            4: 1.15,  # Friday
-            5: 1.05,  # Saturday
-            6: 0.85   # Sunday
-        }
-        
-        return monthly_seasonality.get(month, 1.0) * dow_factors.get(day_of_week, 1.0)
+        return MONTHLY_SEASONALITY.get(month, 1.0) * DOW_FACTORS.get(day_of_week, 1.0)
     
-    def is_holiday(self, date: datetime) -> Tuple[bool, str, float]:
-        """Check if date is a holiday and return multiplier"""
-        # Black Friday check
-        if date.month == 11 and date.weekday() == 4:  # Thursday
-            november_first = datetime(date.year, 11, 1)
-            days_since_first = (date - november_first).days
-            if 21 <= days_since_first <= 27:  # 4th Thursday
-                return True, 'Black Friday', 3.0
-        
-        # Cyber Monday (Monday after Black Friday)
-        if date.month == 11 and date.weekday() == 0:  # Monday
-            november_first = datetime(date.year, 11, 1)
-            days_since_first = (date - november_first).days
-            if 24 <= days_since_first <= 30:  # Monday after 4th Thursday
-                return True, 'Cyber Monday', 2.5
+    def _holidays_for_year(self, year: int) -> Dict[Tuple[int, int], Tuple[str, float]]:
+        """Holiday calendar for a year, computed once and cached"""
+        calendar = self._holiday_calendar.get(year)
+        if calendar is not None:
+            return calendar
+        
+        calendar = {}
         
         # Fixed date holidays
-        date_str = f"{date.month:02d}-{date.day:02d}"
         for holiday, info in self.holidays.items():
             if isinstance(info['date'], str) and '-' in info['date'] and len(info['date']) == 5:
-                if date_str == info['date']:
-                    return True, holiday, info['multiplier']
+                calendar.setdefault((int(info['date'][:2]), int(info['date'][3:])), (holiday, info['multiplier']))
+        
+        for day in range(22, 31):
+            weekday = datetime(year, 11, day).weekday()
+            # Cyber Monday (Monday after Black Friday)
+            if weekday == 0 and day >= 25:
+                calendar[(11, day)] = ('Cyber Monday', 2.5)
+            # Black Friday (4th Friday of November)
+            if weekday == 4 and day <= 28:
+                calendar[(11, day)] = ('Black Friday', 3.0)
+        
+        self._holiday_calendar[year] = calendar
+        return calendar
+    
+    def is_holiday(self, date: datetime) -> Tuple[bool, str, float]:
+        """Check if date is a holiday and return multiplier"""
+        holiday = self._holidays_for_year(date.year).get((date.month, date.day))
+        if holiday is not None:
+            return True, holiday[0], holiday[1]
         
         return False, None, 1.0
     
@@ -150,11 +181,11 @@ class MMMDataGenerator:
                 spend_multiplier *= 0.7  # 30% reduction in efficiency
         
         # Calculate daily spend
-        daily_spend = base_daily_budget * spend_multiplier * (1 + random.uniform(-0.1, 0.1))
+        daily_spend = base_daily_budget * spend_multiplier * (1 + self.rng.uniform(-0.1, 0.1))
         
         # Calculate impressions based on CPM
         if 'base_cpm' in channel_config:
-            cpm = channel_config['base_cpm'] * (1 + random.uniform(-0.2, 0.2))
+            cpm = channel_config['base_cpm'] * (1 + self.rng.uniform(-0.2, 0.2))
             impressions = int((daily_spend / cpm) * 1000)
         else:
             # Email has list-based impressions
@@ -165,14 +196,7 @@ class MMMDataGenerator:
                 impressions = 0
         
         # Calculate clicks (CTR varies by channel)
-        ctr_rates = {
-            'Google Ads': 0.02,
-            'Meta Ads': 0.015,
-            'Email': 0.025,
-            'TikTok': 0.01,
-            'Affiliate': 0.03
-        }
-        ctr = ctr_rates.get(channel, 0.02) * (1 + random.uniform(-0.3, 0.3))
+        ctr = CTR_RATES.get(channel, 0.02) * (1 + self.rng.uniform(-0.3, 0.3))
         clicks = int(impressions * ctr) if impressions > 0 else 0
         
         # Apply diminishing returns to conversion rate
@@ -190,10 +214,10 @@ class MMMDataGenerator:
         # Special handling for affiliate (based on overall brand strength)
         if channel == 'Affiliate':
             base_conversions = channel_config['base_conversions']
-            conversions = int(base_conversions * seasonality * holiday_mult * (1 + random.uniform(-0.2, 0.2)))
+            conversions = int(base_conversions * seasonality * holiday_mult * (1 + self.rng.uniform(-0.2, 0.2)))
         
         # Calculate revenue
-        aov = channel_config.get('avg_order_value', 80) * (1 + random.uniform(-0.1, 0.1))
+        aov = channel_config.get('avg_order_value', 80) * (1 + self.rng.uniform(-0.1, 0.1))
         revenue = conversions * aov
         
         # Special handling for affiliate spend (commission-based)
@@ -217,6 +241,110 @@ class MMMDataGenerator:
             'returning_customers': returning_customers
         }
     
+    def _seasonality_array(self, dates: pd.DatetimeIndex) -> np.ndarray:
+        """Seasonality index for every date at once (see get_seasonality_index)"""
+        monthly = np.array([MONTHLY_SEASONALITY.get(month, 1.0) for month in range(13)])
+        dow = np.array([DOW_FACTORS.get(day, 1.0) for day in range(7)])
+        return monthly[dates.month.to_numpy()] * dow[dates.dayofweek.to_numpy()]
+    
+    def _holiday_arrays(self, dates: pd.DatetimeIndex) -> Tuple[np.ndarray, np.ndarray]:
+        """Holiday name and multiplier for every date at once, None and 1.0 on regular days (see is_holiday)"""
+        holiday_dates = []
+        names = []
+        multipliers = []
+        for year in np.unique(dates.year):
+            for (month, day), (name, multiplier) in self._holidays_for_year(int(year)).items():
+                holiday_dates.append(datetime(int(year), month, day))
+                names.append(name)
+                multipliers.append(multiplier)
+        
+        # Non-holidays get position -1, which picks the trailing None / 1.0
+        positions = pd.DatetimeIndex(holiday_dates).get_indexer(dates.normalize())
+        return np.array(names + [None], dtype=object)[positions], np.append(multipliers, 1.0)[positions]
+    
+    def _generate_channel_series(self, dates: pd.DatetimeIndex, channel: str, base_daily_budget: float) -> Dict[str, np.ndarray]:
+        """Generate a channel's data for every date at once (same model as generate_channel_data)"""
+        channel_config = self.channels[channel]
+        n_days = len(dates)
+        
+        seasonality = self._seasonality_array(dates)
+        _, holiday_mult = self._holiday_arrays(dates)
+        days_since_start = (dates - datetime(2022, 1, 1)).days.to_numpy()
+        
+        # Adjust spend based on seasonality and holidays
+        spend_multiplier = seasonality * holiday_mult
+        
+        # Add channel-specific adjustments
+        if channel == 'TikTok' and channel_config.get('high_growth'):
+            # TikTok grows from 5% to 20% of spend over 2 years
+            spend_multiplier = spend_multiplier * (1 + (days_since_start / 730) * 3)
+        
+        if channel == 'Meta Ads' and channel_config.get('ios14_impact'):
+            # iOS14 impact after April 2021
+            spend_multiplier = np.where(dates >= datetime(2021, 4, 26), spend_multiplier * 0.7, spend_multiplier)
+        
+        # Calculate daily spend
+        daily_spend = base_daily_budget * spend_multiplier * (1 + self.rng.uniform(-0.1, 0.1, n_days))
+        
+        # Calculate impressions based on CPM
+        if 'base_cpm' in channel_config:
+            cpm = channel_config['base_cpm'] * (1 + self.rng.uniform(-0.2, 0.2, n_days))
+            impressions = (daily_spend / cpm * 1000).astype(np.int64)
+        elif channel == 'Email':
+            # Email has list-based impressions, 50% list growth over 2 years and a 25% open rate
+            email_list_size = 50000 * (1 + days_since_start / 730 * 0.5)
+            impressions = (email_list_size * 0.25).astype(np.int64)
+        else:
+            impressions = np.zeros(n_days, dtype=np.int64)
+        
+        # Calculate clicks (CTR varies by channel)
+        ctr = CTR_RATES.get(channel, 0.02) * (1 + self.rng.uniform(-0.3, 0.3, n_days))
+        clicks = (impressions * ctr).astype(np.int64)
+        
+        # Apply diminishing returns to conversion rate
+        dr_factor = np.ones(n_days)
+        dr_point = channel_config.get('diminishing_returns_point')
+        if dr_point is not None:
+            over = daily_spend > dr_point
+            dr_factor[over] = 1.0 / (1 + np.log(daily_spend[over] / dr_point))
+        effective_conv_rate = channel_config.get('conversion_rate', 0.02) * dr_factor * seasonality
+        
+        # Add day-of-week boost for certain channels
+        best_days = [DAY_ABBREVIATIONS.index(day) for day in channel_config.get('best_days', [])]
+        if best_days:
+            effective_conv_rate = np.where(np.isin(dates.dayofweek.to_numpy(), best_days),
+                                           effective_conv_rate * 1.2, effective_conv_rate)
+        
+        # Calculate conversions
+        conversions = (clicks * effective_conv_rate).astype(np.int64)
+        
+        # Special handling for affiliate (based on overall brand strength)
+        if channel == 'Affiliate':
+            base_conversions = channel_config['base_conversions']
+            conversions = (base_conversions * seasonality * holiday_mult * (1 + self.rng.uniform(-0.2, 0.2, n_days))).astype(np.int64)
+        
+        # Calculate revenue
+        aov = channel_config.get('avg_order_value', 80) * (1 + self.rng.uniform(-0.1, 0.1, n_days))
+        revenue = conversions * aov
+        
+        # Special handling for affiliate spend (commission-based)
+        if channel == 'Affiliate':
+            daily_spend = revenue * channel_config['commission_rate']
+        
+        # Split between new and returning customers
+        new_customer_rate = 0.4 if channel != 'Email' else 0.1  # Email has mostly returning
+        new_customers = (conversions * new_customer_rate).astype(np.int64)
+        
+        return {
+            'spend': np.round(daily_spend, 2),
+            'impressions': impressions,
+            'clicks': clicks,
+            'conversions': conversions,
+            'revenue': np.round(revenue, 2),
+            'new_customers': new_customers,
+            'returning_customers': conversions - new_customers
+        }
+    
     def generate_two_years_data(self, start_date: datetime = None) -> pd.DataFrame:
         """Generate 2 years of marketing data with realistic patterns"""
         if start_date is None:
@@ -233,21 +361,23 @@ class MMMDataGenerator:
             'Affiliate': 0  # Commission-based
         }
         
-        all_data = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            for channel in self.channels.keys():
-                daily_data = self.generate_channel_data(
-                    current_date, 
-                    channel, 
-                    base_budgets.get(channel, 1000)
-                )
-                all_data.append(daily_data)
-            
-            current_date += timedelta(days=1)
-        
-        df = pd.DataFrame(all_data)
+        dates = pd.date_range(start_date, end_date, freq='D')
+        channels = list(self.channels.keys())
+        # Generate each channel's whole series at once
+        series = [
+            self._generate_channel_series(dates, channel, base_budgets.get(channel, 1000))
+            for channel in channels
+        ]
+        
+        # Lay the rows out day by day, all channels for each day (days x channels, row-major)
+        df = pd.DataFrame({
+            'date': np.repeat(dates.to_numpy(), len(channels)),
+            'channel': np.tile(channels, len(dates)),
+            **{
+                column: np.column_stack([s[column] for s in series]).ravel()
+                for column in series[0]
+            }
+        })
         return df
     
     def generate_external_factors(self, start_date: datetime = None) -> pd.DataFrame:
@@ -257,84 +387,62 @@ class MMMDataGenerator:
         
         end_date = start_date + timedelta(days=730)
         
-        factors_data = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            is_hol, holiday_name, _ = self.is_holiday(current_date)
-            seasonality = self.get_seasonality_index(current_date)
-            
-            # Simulate competitor activity
-            competitor_activity = None
-            if random.random() < 0.05:  # 5% chance of competitor activity
-                activities = [
-                    "Major competitor sale",
-                    "New competitor launch", 
-                    "Competitor TV campaign",
-                    "Industry event"
-                ]
-                competitor_activity = random.choice(activities)
-            
-            factors_data.append({
-                'date': current_date,
-                'is_holiday': is_hol,
-                'holiday_name': holiday_name,
-                'competitor_activity': competitor_activity,
-                'seasonality_index': round(seasonality, 2)
-            })
-            
-            current_date += timedelta(days=1)
-        
-        return pd.DataFrame(factors_data)
+        # Simulate competitor activity for all days up front (5% chance per day)
+        n_days = (end_date - start_date).days + 1
+        has_competitor_activity = self.rng.random(n_days) < 0.05
+        competitor_choices = self.rng.choice(np.array(COMPETITOR_ACTIVITIES, dtype=object), size=n_days)
+        
+        # Build every column at once instead of a dict per day
+        dates = pd.date_range(start_date, periods=n_days, freq='D')
+        holiday_name, _ = self._holiday_arrays(dates)
+        
+        # Seasonality only depends on (month, weekday), so round each combination once
+        rounded_seasonality = np.array([
+            [round(MONTHLY_SEASONALITY.get(month, 1.0) * DOW_FACTORS.get(day, 1.0), 2) for day in range(7)]
+            for month in range(13)
+        ])
+        
+        return pd.DataFrame({
+            'date': dates,
+            'is_holiday': pd.notna(holiday_name),
+            'holiday_name': holiday_name,
+            'competitor_activity': np.where(has_competitor_activity, competitor_choices, None),
+            'seasonality_index': rounded_seasonality[dates.month.to_numpy(), dates.dayofweek.to_numpy()]
+        })
     
     def generate_campaigns(self, marketing_df: pd.DataFrame) -> pd.DataFrame:
         """Generate campaign metadata based on marketing data"""
-        campaigns = []
-        campaign_id = 1
-        
-        # Generate campaigns for each channel
-        for channel in self.channels.keys():
-            channel_data = marketing_df[marketing_df['channel'] == channel]
-            
-            # Create quarterly campaigns
-            for year in [2022, 2023]:
-                for quarter in range(1, 5):
-                    start_month = (quarter - 1) * 3 + 1
-                    start_date = datetime(year, start_month, 1)
-                    if quarter < 4:
-                        end_date = datetime(year, start_month + 2, 30)
-                    else:
-                        end_date = datetime(year, 12, 31)
-                    
-                    # Calculate budget from actual spend
-                    quarter_data = channel_data[
-                        (channel_data['date'] >= start_date) & 
-                        (channel_data['date'] <= end_date)
-                    ]
-                    
-                    if len(quarter_data) > 0:
-                        budget = quarter_data['spend'].sum()
-                        
-                        # Determine campaign type based on quarter
-                        if quarter in [1, 3]:
-                            campaign_type = 'awareness'
-                        elif quarter == 4:
-                            campaign_type = 'conversion'  # Q4 holiday focus
-                        else:
-                            campaign_type = 'retention'
-                        
-                        campaigns.append({
-                            'id': campaign_id,
-                            'channel': channel,
-                            'campaign_name': f"{channel} - {year} Q{quarter} - {campaign_type.title()}",
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'budget': round(budget, 2),
-                            'campaign_type': campaign_type
-                        })
-                        campaign_id += 1
-        
-        return pd.DataFrame(campaigns)
+        # One quarterly campaign per channel for every quarter with data,
+        # budgeted from the actual spend (channels in generator order).
+        # Quarters the data only partly covers are still emitted, budgeted from
+        # the days present (the default 2022-2023 window yields a one-day 2024 Q1)
+        dates = pd.to_datetime(marketing_df['date'])
+        channel = pd.Categorical(marketing_df['channel'], categories=list(self.channels.keys()))
+        
+        campaigns = marketing_df['spend'].groupby(
+            [pd.Series(channel, index=marketing_df.index, name='channel'),
+             dates.dt.year.rename('year'),
+             dates.dt.quarter.rename('quarter')],
+            observed=True
+        ).sum().reset_index(name='budget')
+        
+        year = campaigns['year']
+        quarter = campaigns['quarter']
+        start_month = (quarter - 1) * 3 + 1
+        
+        # Fill the remaining columns on the aggregated frame itself
+        campaigns['id'] = np.arange(1, len(campaigns) + 1)
+        campaigns['channel'] = campaigns['channel'].astype(str)
+        
+        # Determine campaign type based on quarter (Q4 holiday focus)
+        campaigns['campaign_type'] = np.where(quarter.isin([1, 3]), 'awareness', np.where(quarter == 4, 'conversion', 'retention'))
+        campaigns['campaign_name'] = (campaigns['channel'] + ' - ' + year.astype(str) + ' Q' + quarter.astype(str)
+                                      + ' - ' + campaigns['campaign_type'].str.title())
+        campaigns['start_date'] = pd.to_datetime(pd.DataFrame({'year': year, 'month': start_month, 'day': 1}))
+        campaigns['end_date'] = campaigns['start_date'] + pd.offsets.QuarterEnd(0)
+        campaigns['budget'] = campaigns['budget'].round(2)
+        
+        return campaigns[['id', 'channel', 'campaign_name', 'start_date', 'end_date', 'budget', 'campaign_type']]
 
 if __name__ == "__main__":
     # Test the generator
@@ -1,66 +1,149 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from datetime import datetime
+import logging
 import os
+import orjson
 from dotenv import load_dotenv
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional, Dict, List
-from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Callable
+from contextlib import asynccontextmanager, contextmanager, suppress
+import asyncio
+import fcntl
+import threading
 
 from app.models.database import get_db, SessionLocal, Base, engine
 from app.models.models import DailyMarketingData
 from app.services.metrics_service import MetricsService
 from app.services.attribution_service import AttributionService
 from app.services.optimization_service import OptimizationService
+from app.utils.cache import TTLCache, clear_caches
+from seed_data import seed_database
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Set while this worker waits for or runs the seeding of an empty database
+# (reported by /api/health)
+_SEEDING = threading.Event()
+
+# Read-only GET responses keyed by (endpoint, params), kept for 5 minutes.
+# Cleared whenever the database is (re)seeded.
+_RESPONSE_CACHE = TTLCache(maxsize=256, ttl=300)
+
+def _cached_response(key: tuple, compute: Callable[[], Dict]) -> Dict:
+    """Return a cached response for key, computing and storing it on a miss"""
+    # Responses computed while the tables are being seeded would cache an empty database
+    if _SEEDING.is_set():
+        return compute()
+    # Error payloads (e.g. an unknown channel) are returned but never cached
+    return _RESPONSE_CACHE.get_or_compute(key, compute, cacheable=lambda response: 'error' not in response)
+
+# PostgreSQL advisory lock key, so only one worker seeds an empty database
+SEED_LOCK_KEY = 4_166_001
+
+@contextmanager
+def _seed_lock(conn):
+    """Hold a lock shared by all worker processes while seeding; other workers wait for it"""
+    if engine.dialect.name == 'postgresql':
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SEED_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SEED_LOCK_KEY})
+    elif engine.url.database and engine.url.database != ':memory:':
+        # SQLite file: an exclusive flock on a file beside the database (released on close)
+        with open(f"{engine.url.database}.seed-lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+    else:
+        yield
+
+def _seed_in_background():
+    """Seed an empty database off the event loop (once across workers), then drop everything cached meanwhile"""
+    try:
+        with engine.connect() as conn, _seed_lock(conn):
+            # Another worker may have seeded the database while this one waited for the
+            # lock; seeding again would wipe and regenerate its data
+            if conn.execute(select(1).select_from(DailyMarketingData).limit(1)).first() is not None:
+                logger.info("Database was seeded by another worker")
+            else:
+                seed_database()
+                logger.info("Database seeded successfully")
+    except Exception:
+        logger.exception("Background seeding failed")
+    finally:
+        # Every worker drops the overview/performance responses and period aggregates it
+        # computed while the tables were empty, instead of serving them for their TTL
+        clear_caches()
+        _SEEDING.clear()
+
+async def _refresh_health_timestamp(app: FastAPI):
+    """Keep the health check's timestamp current to the second"""
+    while True:
+        app.state.health_timestamp = datetime.now().isoformat()
+        await asyncio.sleep(1)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Health probes read a timestamp refreshed once a second instead of formatting their own
+    app.state.health_timestamp = datetime.now().isoformat()
+    ticker = asyncio.create_task(_refresh_health_timestamp(app))
+    
     # Startup: Create tables and seed data if empty
     Base.metadata.create_all(bind=engine)
     
+    seed_task = None
     db = SessionLocal()
     try:
-        # Check if we have any data
-        count = db.query(DailyMarketingData).count()
-        if count == 0:
-            print("No data found. Seeding database...")
-            # Import here to avoid circular imports
-            from seed_data import seed_database
-            seed_database()
-            print("Database seeded successfully!")
+        # Check if we have any data (stops at the first row instead of counting the table)
+        has_data = db.execute(select(1).select_from(DailyMarketingData).limit(1)).first() is not None
+        if not has_data:
+            # Seed in a worker thread so the app starts serving (and passes health checks) right away
+            logger.info("No data found. Seeding database in the background...")
+            _SEEDING.set()
+            seed_task = asyncio.create_task(asyncio.to_thread(_seed_in_background))
         else:
-            print(f"Database has {count} marketing data records")
+            logger.info("Database already has marketing data")
     finally:
         db.close()
     
     yield
-    # Shutdown: cleanup (if needed)
+    # Shutdown: stop the ticker and let an in-progress seed finish its transaction
+    ticker.cancel()
+    with suppress(asyncio.CancelledError):
+        await ticker
+    if seed_task is not None:
+        await seed_task
 
 app = FastAPI(
     title="MMM Platform API",
     description="Marketing Mix Modeling Platform for ROI optimization",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson encodes the large breakdown/curve payloads several times faster than json
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
 origins = [
-    "http://localhost:3000",
-    "https://*.up.railway.app",
-    "https://*.railway.app",
-    "*"  # Allow all origins for now
+    "http://localhost:3000"
 ]
 
 # Add environment-specific origins
 if os.getenv("FRONTEND_URL"):
     origins.append(os.getenv("FRONTEND_URL"))
 
+# Railway deployments (*.railway.app and *.up.railway.app) are matched by one regex;
+# wildcard entries in allow_origins are never matched by Starlette
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins temporarily
+    allow_origins=origins,
+    allow_origin_regex=r"https://.*\.railway\.app",
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -74,24 +157,45 @@ class OptimizationRequest(BaseModel):
 class ScenarioRequest(BaseModel):
     scenarios: List[Dict]
 
+def _ndjson_line(row: Dict) -> bytes:
+    return orjson.dumps(row) + b"\n"
+
+# Static responses, encoded once with the same encoder as the default ORJSONResponse
+_ROOT_JSON = orjson.dumps({
+    "message": "MMM Platform API",
+    "version": "1.0.0",
+    "docs": "/docs"
+})
+
+_ATTRIBUTION_MODELS_JSON = orjson.dumps({
+    "models": [
+        {"id": "last_click", "name": "Last Click", "description": "100% credit to last touchpoint"},
+        {"id": "linear", "name": "Linear", "description": "Equal credit to all touchpoints"},
+        {"id": "time_decay", "name": "Time Decay", "description": "More credit to recent touchpoints"},
+        {"id": "u_shaped", "name": "U-Shaped", "description": "40% first, 40% last, 20% middle"},
+        {"id": "data_driven", "name": "Data-Driven", "description": "ML-based attribution"}
+    ]
+})
+
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+
 @app.get("/")
 def root():
-    return {
-        "message": "MMM Platform API",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
+    return Response(content=_ROOT_JSON, media_type="application/json")
 
 @app.get("/api/health")
 def health_check():
     return {
         "status": "healthy",
-        "timestamp": datetime.now(),
-        "environment": os.getenv("ENVIRONMENT", "development")
+        "timestamp": app.state.health_timestamp,
+        "environment": ENVIRONMENT,
+        "seeding": _SEEDING.is_set()
     }
 
+# Handlers that use the (synchronous) database session are plain defs, so FastAPI
+# runs them in its threadpool instead of blocking the event loop
 @app.get("/api/metrics/overview")
-async def get_overview_metrics(start_date: str, end_date: str, db: Session = Depends(get_db)):
+def get_overview_metrics(start_date: str, end_date: str, db: Session = Depends(get_db)):
     """
     Returns:
     - Total spend
@@ -101,10 +205,11 @@ async def get_overview_metrics(start_date: str, end_date: str, db: Session = Dep
     - Period-over-period comparison
     """
     metrics_service = MetricsService(db)
-    return metrics_service.get_overview_metrics(start_date, end_date)
+    return _cached_response(("overview", start_date, end_date),
+                            lambda: metrics_service.get_overview_metrics(start_date, end_date))
 
 @app.get("/api/channels/{channel}/performance")
-async def get_channel_performance(channel: str, start_date: str, end_date: str, db: Session = Depends(get_db)):
+def get_channel_performance(channel: str, start_date: str, end_date: str, db: Session = Depends(get_db)):
     """
     Returns:
     - Spend over time
@@ -114,16 +219,32 @@ async def get_channel_performance(channel: str, start_date: str, end_date: str,
     - Optimization opportunities
     """
     metrics_service = MetricsService(db)
-    return metrics_service.get_channel_performance(channel, start_date, end_date)
+    return _cached_response(("channel_performance", channel, start_date, end_date),
+                            lambda: metrics_service.get_channel_performance(channel, start_date, end_date))
 
 @app.get("/api/channels/{channel}/trends")
-async def get_channel_trends(channel: str, days: int = 30, db: Session = Depends(get_db)):
+def get_channel_trends(channel: str, days: int = 30, db: Session = Depends(get_db)):
     """Get recent trends for a specific channel"""
     metrics_service = MetricsService(db)
-    return metrics_service.get_channel_trends(channel, days)
+    return _cached_response(("channel_trends", channel, days),
+                            lambda: metrics_service.get_channel_trends(channel, days))
+
+@app.get("/api/channels/{channel}/trends/stream")
+def stream_channel_trends(channel: str, days: int = 30):
+    """Stream recent weekly trends for a channel as NDJSON (one row per line)"""
+    # The generator runs after this handler returns, so it owns its session
+    def rows():
+        db = SessionLocal()
+        try:
+            for row in MetricsService(db).iter_channel_trends(channel, days):
+                yield _ndjson_line(row)
+        finally:
+            db.close()
+    
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
 
 @app.post("/api/optimize")
-async def optimize_budget(request: OptimizationRequest, db: Session = Depends(get_db)):
+def optimize_budget(request: OptimizationRequest, db: Session = Depends(get_db)):
     """
     Allocate budget to maximize total revenue
     using marginal ROAS equalization
@@ -132,48 +253,50 @@ async def optimize_budget(request: OptimizationRequest, db: Session = Depends(ge
     return optimization_service.optimize_budget(request.total_budget, request.constraints)
 
 @app.post("/api/optimize/scenarios")
-async def simulate_scenarios(request: ScenarioRequest, db: Session = Depends(get_db)):
+def simulate_scenarios(request: ScenarioRequest, db: Session = Depends(get_db)):
     """Simulate multiple budget scenarios"""
     optimization_service = OptimizationService(db)
     return optimization_service.simulate_scenarios(request.scenarios)
 
 @app.get("/api/optimize/diminishing-returns")
-async def get_diminishing_returns(db: Session = Depends(get_db)):
+def get_diminishing_returns(db: Session = Depends(get_db)):
     """Analyze diminishing returns for each channel"""
     optimization_service = OptimizationService(db)
-    return optimization_service.get_diminishing_returns_analysis()
+    return _cached_response(("diminishing_returns",),
+                            optimization_service.get_diminishing_returns_analysis)
 
 @app.get("/api/attribution/models")
 async def get_attribution_models():
     """List available attribution models"""
-    return {
-        "models": [
-            {"id": "last_click", "name": "Last Click", "description": "100% credit to last touchpoint"},
-            {"id": "linear", "name": "Linear", "description": "Equal credit to all touchpoints"},
-            {"id": "time_decay", "name": "Time Decay", "description": "More credit to recent touchpoints"},
-            {"id": "u_shaped", "name": "U-Shaped", "description": "40% first, 40% last, 20% middle"},
-            {"id": "data_driven", "name": "Data-Driven", "description": "ML-based attribution"}
-        ]
-    }
+    return Response(content=_ATTRIBUTION_MODELS_JSON, media_type="application/json")
 
 @app.get("/api/attribution/calculate")
-async def calculate_attribution(start_date: str, end_date: str, model: str = "linear", db: Session = Depends(get_db)):
+def calculate_attribution(start_date: str, end_date: str, model: str = "linear", db: Session = Depends(get_db)):
     """Calculate attribution for a given period and model"""
     attribution_service = AttributionService(db)
     return attribution_service.calculate_attribution(start_date, end_date, model)
 
 @app.get("/api/attribution/compare")
-async def compare_attribution_models(start_date: str, end_date: str, db: Session = Depends(get_db)):
+def compare_attribution_models(start_date: str, end_date: str, db: Session = Depends(get_db)):
     """Compare results across different attribution models"""
     try:
         attribution_service = AttributionService(db)
         return attribution_service.compare_attribution_models(start_date, end_date)
     except Exception as e:
-        print(f"Attribution comparison error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Attribution comparison error")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Auto-reload only in development; elsewhere run WEB_CONCURRENCY worker processes
+    # (uvicorn[standard] brings uvloop and httptools, which "auto" selects)
+    development = ENVIRONMENT == "development"
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        reload=development,
+        workers=None if development else int(os.getenv("WEB_CONCURRENCY", "4")),
+        loop="auto",
+        http="auto"
+    )
\ No newline at end of file
@@ -1,8 +1,9 @@
 from app.models.database import Base, engine, SessionLocal
 from app.models.models import DailyMarketingData, Campaign, ExternalFactor, AttributionResult
 from app.utils.data_generator import MMMDataGenerator
-from datetime import datetime
-import pandas as pd
+from app.utils.bulk_load import insert_frame
+from sqlalchemy import func, text
+from datetime import datetime, timedelta
 
 def seed_database():
     # Create a database session
@@ -15,7 +16,6 @@ def seed_database():
         db.query(Campaign).delete()
         db.query(ExternalFactor).delete()
         db.query(AttributionResult).delete()
-        db.commit()
         
         # Initialize the data generator
         generator = MMMDataGenerator()
@@ -23,56 +23,40 @@ def seed_database():
         # Generate 2 years of marketing data ending yesterday
         print("Generating marketing data...")
         # End at yesterday, start 2 years before
-        end_date = datetime.now() - pd.Timedelta(days=1)
-        start_date = end_date - pd.Timedelta(days=730)
+        end_date = datetime.now() - timedelta(days=1)
+        start_date = end_date - timedelta(days=730)
         marketing_data = generator.generate_two_years_data(start_date)
         
         # Insert marketing data
         print(f"Inserting {len(marketing_data)} rows of marketing data...")
-        for _, row in marketing_data.iterrows():
-            record = DailyMarketingData(
-                date=row['date'],
-                channel=row['channel'],
-                spend=row['spend'],
-                impressions=row['impressions'],
-                clicks=row['clicks'],
-                conversions=row['conversions'],
-                revenue=row['revenue'],
-                new_customers=row['new_customers'],
-                returning_customers=row['returning_customers']
-            )
-            db.add(record)
+        insert_frame(db, DailyMarketingData, marketing_data, [
+            'date', 'channel', 'spend', 'impressions', 'clicks', 'conversions',
+            'revenue', 'new_customers', 'returning_customers'
+        ])
         
         # Generate and insert external factors
         print("Generating external factors...")
         external_factors = generator.generate_external_factors(start_date)
         print(f"Inserting {len(external_factors)} rows of external factors...")
-        for _, row in external_factors.iterrows():
-            record = ExternalFactor(
-                date=row['date'],
-                is_holiday=row['is_holiday'],
-                holiday_name=row['holiday_name'],
-                competitor_activity=row['competitor_activity'],
-                seasonality_index=row['seasonality_index']
-            )
-            db.add(record)
+        insert_frame(db, ExternalFactor, external_factors, [
+            'date', 'is_holiday', 'holiday_name', 'competitor_activity', 'seasonality_index'
+        ])
         
         # Generate and insert campaigns
         print("Generating campaigns...")
         campaigns = generator.generate_campaigns(marketing_data)
         print(f"Inserting {len(campaigns)} campaigns...")
-        for _, row in campaigns.iterrows():
-            record = Campaign(
-                channel=row['channel'],
-                campaign_name=row['campaign_name'],
-                start_date=row['start_date'],
-                end_date=row['end_date'],
-                budget=row['budget'],
-                campaign_type=row['campaign_type']
-            )
-            db.add(record)
+        insert_frame(db, Campaign, campaigns, [
+            'channel', 'campaign_name', 'start_date', 'end_date', 'budget', 'campaign_type'
+        ])
+        
+        # Commit all changes (clearing and seeding are one transaction)
+        db.commit()
         
-        # Commit all changes
+        # Refresh planner statistics for the freshly loaded tables, so date/channel
+        # range queries pick their indexes right away
+        for table in ('daily_marketing_data', 'external_factors', 'campaigns'):
+            db.execute(text(f"ANALYZE {table}"))
         db.commit()
         print("\nDatabase seeded successfully!")
         
@@ -82,16 +66,21 @@ def seed_database():
         print(f"- Campaigns: {db.query(Campaign).count()} records")
         print(f"- External Factors: {db.query(ExternalFactor).count()} records")
         
-        # Show sample data by channel
-        print("\nSample data by channel:")
+        # Show a summary by channel (one grouped query for all channels)
+        print("\nSummary by channel:")
+        channel_summary = {
+            row.channel: row for row in db.query(
+                DailyMarketingData.channel,
+                func.max(DailyMarketingData.date).label('latest_date'),
+                func.sum(DailyMarketingData.spend).label('spend'),
+                func.sum(DailyMarketingData.revenue).label('revenue')
+            ).group_by(DailyMarketingData.channel).all()
+        }
         for channel in ['Google Ads', 'Meta Ads', 'Email', 'TikTok', 'Affiliate']:
-            channel_data = db.query(DailyMarketingData).filter(
-                DailyMarketingData.channel == channel
-            ).limit(5).all()
-            if channel_data:
-                latest = channel_data[0]
+            summary = channel_summary.get(channel)
+            if summary:
                 print(f"\n{channel}:")
-                print(f"  Date: {latest.date}, Spend: ${latest.spend}, Revenue: ${latest.revenue}")
+                print(f"  Latest date: {summary.latest_date}, Total spend: ${summary.spend:,.2f}, Total revenue: ${summary.revenue:,.2f}")
         
     except Exception as e:
         print(f"Error seeding database: {e}")
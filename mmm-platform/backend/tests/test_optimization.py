@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+
+from app.services.optimization_service import OptimizationService, _curve_revenue, _inlier_mask
+
+A = np.array([42000.0, 18000.0, 2500.0, 9000.0, 6000.0])
+BOUNDS = [(1000, 4767), (500, 3000), (10, 800), (200, 2500), (0, 1500)]
+
+
+@pytest.fixture
+def service():
+    # The solvers never touch the database
+    return OptimizationService(None)
+
+
+def _slsqp(a, total_budget, bounds):
+    """Reference solution of max sum(a * log(x + 1)) s.t. sum(x) == total_budget"""
+    result = minimize(
+        lambda x: -_curve_revenue(x, a, 0.0).sum(),
+        np.full(len(a), total_budget / len(a)),
+        method='SLSQP',
+        bounds=bounds,
+        constraints={'type': 'eq', 'fun': lambda x: x.sum() - total_budget},
+        options={'maxiter': 1000, 'ftol': 1e-12}
+    )
+    assert result.success
+    return result.x
+
+
+def test_water_fill_matches_slsqp_on_feasible_budget(service):
+    total_budget = 8000.0
+
+    x = service._water_fill(A, total_budget, BOUNDS)
+    reference = _slsqp(A, total_budget, BOUNDS)
+
+    lower, upper = np.array(BOUNDS, dtype=np.float64).T
+    assert x.sum() == pytest.approx(total_budget)
+    assert np.all(x >= lower) and np.all(x <= upper)
+    np.testing.assert_allclose(x, reference, rtol=1e-3, atol=0.5)
+    assert _curve_revenue(x, A, 0.0).sum() >= _curve_revenue(reference, A, 0.0).sum() - 1e-6
+
+
+def test_infeasible_budget_caps_every_channel(service):
+    upper = np.array([high for _, high in BOUNDS], dtype=np.float64)
+    total_budget = upper.sum() * 3
+
+    np.testing.assert_allclose(service._water_fill(A, total_budget, BOUNDS), upper)
+
+    # The L-BFGS-B fallback (non-positive curve coefficients) must respect the caps too
+    a = A.copy()
+    a[1] = -500.0
+    x = service._solve_reduced(a, 0.0, total_budget, BOUNDS, np.full(len(a), total_budget / len(a)))
+    np.testing.assert_allclose(x, upper)
+
+
+def test_solve_reduced_spends_feasible_budget_within_bounds(service):
+    a = A.copy()
+    a[1] = -500.0
+    total_budget = 8000.0
+
+    x = service._solve_reduced(a, 0.0, total_budget, BOUNDS, np.full(len(a), total_budget / len(a)))
+
+    lower, upper = np.array(BOUNDS, dtype=np.float64).T
+    assert x.sum() == pytest.approx(total_budget)
+    assert np.all(x >= lower - 1e-9) and np.all(x <= upper + 1e-9)
+
+
+def test_inlier_mask_uses_median_absolute_deviation():
+    # Median 6, MAD 3: the cutoff is 1.4826 * 3 * 3 ~= 13.3 from the median
+    y = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 17], dtype=np.float64)
+    # 17 is kept, though the 1.5 * IQR fence (upper 16) would drop it
+    assert _inlier_mask(y).all()
+
+    y[-1] = 20.0
+    np.testing.assert_array_equal(_inlier_mask(y), [True] * 10 + [False])
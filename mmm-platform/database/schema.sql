@@ -55,8 +55,10 @@ CREATE TABLE attribution_results (
 );
 
 -- Indexes for performance
-CREATE INDEX idx_daily_data_date ON daily_marketing_data(date);
-CREATE INDEX idx_daily_data_channel ON daily_marketing_data(channel);
+-- (date-range scans on daily_marketing_data and external_factors use the primary keys,
+-- which lead with date)
+CREATE INDEX idx_daily_data_channel_date ON daily_marketing_data(channel, date);
 CREATE INDEX idx_campaigns_channel ON campaigns(channel);
 CREATE INDEX idx_campaigns_dates ON campaigns(start_date, end_date);
-CREATE INDEX idx_attribution_date_channel ON attribution_results(date, channel);
\ No newline at end of file
+CREATE INDEX idx_attribution_date_channel ON attribution_results(date, channel);
+CREATE INDEX idx_attribution_model_date ON attribution_results(model_type, date);
\ No newline at end of file
@@ -3,6 +3,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.app.utils.data_generator import MMMDataGenerator
+from backend.app.utils.bulk_load import insert_frame
 from backend.app.models.database import engine, SessionLocal
 from backend.app.models.models import Base, DailyMarketingData, Campaign, ExternalFactor
 from sqlalchemy import text
@@ -13,7 +14,6 @@ def clear_tables(db):
     """Clear existing data from tables"""
     try:
         db.execute(text("TRUNCATE TABLE daily_marketing_data, campaigns, external_factors, attribution_results CASCADE"))
-        db.commit()
         print("Tables cleared successfully")
     except Exception as e:
         print(f"Error clearing tables: {e}")
@@ -23,56 +23,31 @@ def populate_marketing_data(db, df):
     """Populate daily_marketing_data table"""
     print("Populating marketing data...")
     
-    for _, row in df.iterrows():
-        data = DailyMarketingData(
-            date=row['date'],
-            channel=row['channel'],
-            spend=row['spend'],
-            impressions=row['impressions'],
-            clicks=row['clicks'],
-            conversions=row['conversions'],
-            revenue=row['revenue'],
-            new_customers=row['new_customers'],
-            returning_customers=row['returning_customers']
-        )
-        db.add(data)
+    insert_frame(db, DailyMarketingData, df, [
+        'date', 'channel', 'spend', 'impressions', 'clicks', 'conversions',
+        'revenue', 'new_customers', 'returning_customers'
+    ])
     
-    db.commit()
     print(f"Added {len(df)} rows to daily_marketing_data")
 
 def populate_campaigns(db, df):
     """Populate campaigns table"""
     print("Populating campaigns...")
     
-    for _, row in df.iterrows():
-        campaign = Campaign(
-            channel=row['channel'],
-            campaign_name=row['campaign_name'],
-            start_date=row['start_date'],
-            end_date=row['end_date'],
-            budget=row['budget'],
-            campaign_type=row['campaign_type']
-        )
-        db.add(campaign)
+    insert_frame(db, Campaign, df, [
+        'channel', 'campaign_name', 'start_date', 'end_date', 'budget', 'campaign_type'
+    ])
     
-    db.commit()
     print(f"Added {len(df)} campaigns")
 
 def populate_external_factors(db, df):
     """Populate external_factors table"""
     print("Populating external factors...")
     
-    for _, row in df.iterrows():
-        factor = ExternalFactor(
-            date=row['date'],
-            is_holiday=row['is_holiday'],
-            holiday_name=row['holiday_name'],
-            competitor_activity=row['competitor_activity'],
-            seasonality_index=row['seasonality_index']
-        )
-        db.add(factor)
+    insert_frame(db, ExternalFactor, df, [
+        'date', 'is_holiday', 'holiday_name', 'competitor_activity', 'seasonality_index'
+    ])
     
-    db.commit()
     print(f"Added {len(df)} rows to external_factors")
 
 def main():
@@ -97,13 +72,18 @@ def main():
     db = SessionLocal()
     
     try:
+        # Seed-only run: don't wait for the WAL flush on commit
+        if engine.dialect.name == 'postgresql':
+            db.execute(text("SET LOCAL synchronous_commit = OFF"))
+        
         # Clear existing data
         clear_tables(db)
         
-        # Populate tables
+        # Populate tables (one transaction, committed once)
         populate_marketing_data(db, marketing_data)
         populate_external_factors(db, external_factors)
         populate_campaigns(db, campaigns)
+        db.commit()
         
         # Print summary statistics
         print("\n=== Data Generation Summary ===")